@@ -3,29 +3,27 @@
 Bootstrap script for Serial Monitor Daemon MCP Server
 Adds vendored dependencies to Python path before importing main modules
 """
+import os
 import sys
 from pathlib import Path
 
 def setup_vendored_packages():
     """Add vendored packages to Python path"""
-    daemon_dir = Path(__file__).parent
-    vendor_dir = daemon_dir / "vendor"
+    vendor_dir = Path(__file__).parent / "vendor"
+    names = ("pyserial", "mcp")  # Contain serial/ and mcp/ packages
     
-    # Add vendored packages to Python path
-    vendor_packages = [
-        vendor_dir / "pyserial",  # Contains serial/ package
-        vendor_dir / "psutil",    # Contains psutil/ package  
-        vendor_dir / "mcp",       # Contains mcp/ package
-    ]
+    # One directory read instead of a stat() per package
+    try:
+        entries = {e.name: e.path for e in os.scandir(vendor_dir)}
+    except FileNotFoundError:
+        entries = {}
+    
+    # Add directories to sys.path so imports work (nothing is there yet at startup)
+    sys.path[:0] = [entries[name] for name in names if name in entries]
     
-    for package_path in vendor_packages:
-        if package_path.exists():
-            # Add directory to sys.path so imports work
-            path_str = str(package_path)
-            if path_str not in sys.path:
-                sys.path.insert(0, path_str)
-        else:
-            print(f"Warning: Vendored package not found: {package_path}", file=sys.stderr)
+    for name in names:
+        if name not in entries:
+            print(f"Warning: Vendored package not found: {vendor_dir / name}", file=sys.stderr)
 
 def main():
     """Bootstrap and run the MCP server"""
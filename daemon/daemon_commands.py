@@ -1,40 +1,268 @@
 """
 Daemon Command Interface
 Allows external processes to send commands to the running daemon
+
+Commands travel over a local stream socket (Unix domain socket on POSIX,
+loopback TCP on Windows) as length-prefixed JSON frames. Any local user can
+connect to a loopback port, so there the daemon publishes a random token next
+to the port number in a file only its user can read, and a connection's first
+frame must be {"token": ...}. Clients keep their
+connection open between commands. A frame is either a single command or a
+{"batch": [...]} of commands, answered with {"results": [...]}.
+
+A single command may carry raw bytes: it sets "payload_length" and the bytes
+follow the JSON frame unencoded (used by write, so binary data isn't pushed
+through JSON).
+
+The daemon side never blocks on a client: connections are non-blocking, frames
+are reassembled in per-connection buffers and replies that don't fit in the
+socket buffer are queued until the client reads them.
 """
-import json
+import hmac
+import secrets
+import selectors
+import socket
+import struct
+import threading
 import time
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, List, Tuple
+
+from daemon_manager import DEFAULT_BASE_DIR, atomic_write, ensure_dir
+
+# orjson is optional: faster and returns bytes directly; otherwise use compact stdlib JSON
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    import json
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    _loads = json.loads
+
+# Frame header: payload length as little-endian unsigned 32-bit int
+_HEADER = struct.Struct("<I")
+_MAX_FRAME = 16 * 1024 * 1024  # Refuse absurd frames from confused peers
+_RECV_SIZE = 256 * 1024  # Bytes read from a client per wake-up
+
+# Windows Python has no AF_UNIX support, fall back to loopback TCP there
+_USE_UNIX_SOCKET = hasattr(socket, 'AF_UNIX')
+
+
+def _send_frame(sock: socket.socket, message: Dict[str, Any], payload: Optional[bytes] = None):
+    """Send one JSON message as a length-prefixed frame, followed by any raw payload"""
+    frame = _dumps(message)
+    sock.sendall(_HEADER.pack(len(frame)) + frame)
+    if payload:
+        sock.sendall(payload)  # Separate send, large payloads aren't copied into the frame
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytearray:
+    """Read exactly size bytes straight into a new buffer (raises ConnectionError on EOF)"""
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            raise ConnectionError("Connection closed by peer")
+        received += n
+    return buf
+
+
+def _check_size(size: int, what: str = "Frame"):
+    """Refuse frames and payloads over _MAX_FRAME (ValueError)"""
+    if size > _MAX_FRAME:
+        raise ValueError(f"{what} too large: {size} bytes")
+
+
+def _parse_message(body: bytes) -> Tuple[Dict[str, Any], Optional[int]]:
+    """
+    Decode and validate the JSON part of a frame
+
+    Raises ValueError for anything that isn't a well-formed message, so callers
+    drop the connection as with any other protocol error.
+
+    Returns:
+        (message, length of the raw payload that follows, or None for none)
+    """
+    message = _loads(body)
+    if not isinstance(message, dict):
+        raise ValueError(f"Frame is not an object: {type(message).__name__}")
+    batch = message.get('batch')
+    if batch is not None and not (isinstance(batch, list)
+                                  and all(isinstance(c, dict) for c in batch)):
+        raise ValueError("Batch must be a list of objects")
+    if 'payload_length' not in message:
+        return message, None
+    size = message.pop('payload_length')
+    if not isinstance(size, int) or size < 0:
+        raise ValueError(f"Bad payload length: {size!r}")
+    _check_size(size, "Payload")
+    return message, size
+
+
+def _recv_frame(sock: socket.socket) -> Dict[str, Any]:
+    """
+    Receive one length-prefixed JSON message (blocking, client side)
+
+    Raises ValueError for anything that isn't a well-formed message.
+    """
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    _check_size(size)
+    message, payload_length = _parse_message(_recv_exact(sock, size))
+    if payload_length is not None:
+        message['payload'] = _recv_exact(sock, payload_length)
+    return message
+
+
+class _Connection:
+    """Buffers of one client connection on the daemon side"""
+
+    __slots__ = ('authenticated', 'inbox', 'outbox', 'message', 'payload_length')
+
+    def __init__(self, authenticated: bool = True):
+        self.authenticated = authenticated  # Token frame received (or none needed)
+        self.inbox = bytearray()   # Received, not yet parsed
+        self.outbox = bytearray()  # Replies the client hasn't taken yet
+        self.message: Optional[Dict[str, Any]] = None  # Waiting for its payload
+        self.payload_length = 0
+
+    def frames(self) -> List[Dict[str, Any]]:
+        """Take the complete messages out of the inbox (ValueError if malformed)"""
+        inbox = self.inbox
+        messages = []
+        while True:
+            if self.message is None:
+                if len(inbox) < _HEADER.size:
+                    break
+                (size,) = _HEADER.unpack_from(inbox)
+                _check_size(size)
+                end = _HEADER.size + size
+                if len(inbox) < end:
+                    break
+                message, payload_length = _parse_message(inbox[_HEADER.size:end])
+                del inbox[:end]
+                if payload_length is None:
+                    messages.append(message)
+                    continue
+                self.message, self.payload_length = message, payload_length
+
+            if len(inbox) < self.payload_length:
+                break
+            self.message['payload'] = inbox[:self.payload_length]
+            del inbox[:self.payload_length]
+            messages.append(self.message)
+            self.message = None
+        return messages
 
 
 class DaemonCommands:
     """Command interface for daemon control"""
-    
-    def __init__(self, command_dir: Optional[Path] = None):
+
+    def __init__(self, command_dir: Optional[Path] = None, timeout: float = 5.0):
         """
         Initialize command interface
-        
+
         Args:
-            command_dir: Directory for command files (default: ~/.serial-monitor/)
-        """
-        if command_dir is None:
-            command_dir = Path.home() / ".serial-monitor"
-        
-        self.command_dir = Path(command_dir)
-        self.command_dir.mkdir(parents=True, exist_ok=True)
-        
-        self.command_file = self.command_dir / "daemon_command.json"
-        self.response_file = self.command_dir / "daemon_response.json"
-    
-    def send_command(self, command: str, **kwargs) -> Dict[str, Any]:
+            command_dir: Directory for socket files (default: ~/.serial-monitor/ or $SERIAL_MONITOR_HOME)
+            timeout: Seconds to wait for a daemon response (default 5)
+        """
+        self.command_dir = DEFAULT_BASE_DIR if command_dir is None else Path(command_dir)
+        ensure_dir(self.command_dir)
+
+        # POSIX: Unix domain socket path
+        # Windows: loopback TCP port and access token published by the daemon
+        # in daemon.port ("<port> <token>", readable by the daemon's user only)
+        self.socket_path = self.command_dir / "daemon.sock"
+        self.port_file = self.command_dir / "daemon.port"
+        self.timeout = timeout
+
+        # Client-side connection per thread, kept open between commands
+        self._tls = threading.local()
+
+        # Server-side state (only used inside the daemon)
+        self._listener: Optional[socket.socket] = None
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._token: Optional[bytes] = None  # Expected first frame token (TCP only)
+
+    @property
+    def _conn(self) -> Optional[socket.socket]:
+        """This thread's client connection (None until the first command)"""
+        return getattr(self._tls, 'conn', None)
+
+    @_conn.setter
+    def _conn(self, conn: Optional[socket.socket]):
+        self._tls.conn = conn
+
+    def _connect(self) -> socket.socket:
+        """Open a client connection to the daemon command socket"""
+        if _USE_UNIX_SOCKET:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address = str(self.socket_path)
+        else:
+            port, token = self.port_file.read_text().split()
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            # Commands are tiny, don't let Nagle hold them back
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            address = ('127.0.0.1', int(port))
+
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(address)
+            if not _USE_UNIX_SOCKET:
+                # Not answered, the daemon drops the connection if it's wrong
+                _send_frame(sock, {'token': token})
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def __enter__(self) -> 'DaemonCommands':
+        """
+        Connect up front and close the connection when the block ends
+
+        If the daemon can't be reached, send_command() retries the connection
+        and reports DAEMON_UNREACHABLE as usual.
+        """
+        if self._conn is None:
+            try:
+                self._conn = self._connect()
+            except (OSError, ValueError):
+                pass
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close the kept-alive connection"""
+        self.close()
+
+    def close(self):
+        """
+        Close this thread's kept-alive connection
+
+        The next command reconnects, so this is safe to call at any time.
+        """
+        self._close_conn()
+
+    def _close_conn(self):
+        """Close the held client connection, if any"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def send_command(self, command: str, payload: Optional[bytes] = None, **kwargs) -> Dict[str, Any]:
         """
         Send command to daemon and wait for response
-        
+
         Args:
             command: Command name (connect, disconnect, status)
+            payload: Raw bytes sent after the command frame (arrives as cmd['payload'])
             **kwargs: Command arguments
-        
+
         Returns:
             Response dictionary
         """
@@ -44,69 +272,262 @@ class DaemonCommands:
             'timestamp': time.time(),
             **kwargs
         }
-        
-        # Clear old response
-        if self.response_file.exists():
-            self.response_file.unlink()
-        
-        # Write command file
-        with open(self.command_file, 'w') as f:
-            json.dump(cmd_data, f)
-        
-        # Wait for response (timeout 5 seconds)
-        for _ in range(50):
-            time.sleep(0.1)
-            if self.response_file.exists():
+        if payload is not None:
+            cmd_data['payload_length'] = len(payload)
+        return self._request(cmd_data, payload)
+
+    def send_batch(self, commands: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Send several commands in one frame and wait for all responses
+
+        The daemon runs them in order and answers with a single frame, so the
+        whole batch costs one round-trip.
+
+        Args:
+            commands: List of (command name, arguments) tuples
+
+        Returns:
+            One response dictionary per command (all the same error response
+            if the batch couldn't be delivered)
+        """
+        timestamp = time.time()
+        response = self._request({
+            'batch': [{'command': command, 'timestamp': timestamp, **kwargs}
+                      for command, kwargs in commands]
+        })
+        if 'results' in response:
+            return response['results']
+        return [response] * len(commands)
+
+    def _request(self, message: Dict[str, Any], payload: Optional[bytes] = None) -> Dict[str, Any]:
+        """Send one frame and wait for the reply frame (errors come back as responses)"""
+        for _ in range(2):
+            reused = self._conn is not None
+            if not reused:
                 try:
-                    with open(self.response_file, 'r') as f:
-                        response = json.load(f)
-                    
-                    # Clean up
-                    self.response_file.unlink()
-                    self.command_file.unlink()
-                    
-                    return response
-                except Exception as e:
-                    print(f"Error reading response: {e}")
-                    break
-        
-        # Timeout
-        if self.command_file.exists():
-            self.command_file.unlink()
-        
-        return {
-            'success': False,
-            'error': 'TIMEOUT',
-            'message': 'Daemon did not respond to command'
-        }
-    
-    def check_for_command(self) -> Optional[Dict[str, Any]]:
+                    self._conn = self._connect()
+                except (OSError, ValueError) as e:
+                    return {
+                        'success': False,
+                        'error': 'DAEMON_UNREACHABLE',
+                        'message': f'Could not connect to daemon command socket: {e}'
+                    }
+
+            try:
+                _send_frame(self._conn, message, payload)
+                return _recv_frame(self._conn)
+            except socket.timeout:
+                self._close_conn()  # A late reply would desync the stream
+                return {
+                    'success': False,
+                    'error': 'TIMEOUT',
+                    'message': 'Daemon did not respond to command'
+                }
+            except (OSError, ValueError) as e:
+                self._close_conn()
+                if reused and isinstance(e, ConnectionError):
+                    continue  # Kept-alive connection went stale (daemon restarted), reconnect once
+                return {
+                    'success': False,
+                    'error': 'IPC_ERROR',
+                    'message': f'Error talking to daemon: {e}'
+                }
+
+    def start_server(self):
         """
-        Check if there's a pending command (called by daemon)
-        
+        Bind the command socket and start accepting clients (called by daemon)
+
+        Must only be called while holding the daemon lock, since it replaces
+        any socket file left behind by a previous daemon.
+        """
+        if _USE_UNIX_SOCKET:
+            try:
+                self.socket_path.unlink()
+            except FileNotFoundError:
+                pass
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(str(self.socket_path))
+        else:
+            listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            listener.bind(('127.0.0.1', 0))
+            token = secrets.token_urlsafe(32)
+            self._token = token.encode()
+            atomic_write(self.port_file, f"{listener.getsockname()[1]} {token}".encode(), mode=0o600)
+
+        listener.listen(8)
+        listener.setblocking(False)
+
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(listener, selectors.EVENT_READ)
+        self._listener = listener
+
+    def process_commands(self, handler: Callable[[Dict[str, Any]], Dict[str, Any]],
+                         timeout: Optional[float] = 0) -> int:
+        """
+        Accept clients and answer the commands that have arrived (called by daemon)
+
+        Waits once and serves each ready connection once, so the caller's own
+        work (database flush) runs between calls however busy the clients are.
+        Never blocks on a client: partial frames wait in the connection's buffer.
+
+        Args:
+            handler: Called with each command dictionary, returns the response dictionary
+            timeout: Seconds to wait for activity (0 = don't block, None = block forever)
+
         Returns:
-            Command dictionary or None
+            Number of commands handled
         """
-        if not self.command_file.exists():
-            return None
-        
+        if self._selector is None:
+            return 0
+
         try:
-            with open(self.command_file, 'r') as f:
-                cmd_data = json.load(f)
-            return cmd_data
-        except Exception as e:
-            print(f"Error reading command file: {e}")
+            events = self._selector.select(timeout)
+        except (OSError, ValueError):
+            # stop_server() ran from a signal handler while we were waiting
+            if self._selector is None:
+                return 0
+            raise
+
+        handled = 0
+        for key, mask in events:
+            if self._selector is None:
+                break  # A command shut the daemon down
+            if key.fileobj is self._listener:
+                conn = self._accept()
+                if conn is not None:
+                    # A new client usually has its command waiting already
+                    handled += self._serve(conn, self._selector.get_key(conn).data, handler)
+                continue
+
+            if mask & selectors.EVENT_WRITE:
+                self._flush(key.fileobj, key.data)
+            else:
+                handled += self._serve(key.fileobj, key.data, handler)
+
+        return handled
+
+    def _accept(self) -> Optional[socket.socket]:
+        """Accept a pending client connection (None if there was none)"""
+        try:
+            conn, _ = self._listener.accept()
+        except (BlockingIOError, InterruptedError):
             return None
-    
-    def send_response(self, response: Dict[str, Any]):
+        conn.setblocking(False)
+        if not _USE_UNIX_SOCKET:
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._selector.register(conn, selectors.EVENT_READ, _Connection(self._token is None))
+        return conn
+
+    def _serve(self, conn: socket.socket, state: _Connection,
+               handler: Callable[[Dict[str, Any]], Dict[str, Any]]) -> int:
+        """Read what the client has sent and answer its complete commands"""
+        try:
+            data = conn.recv(_RECV_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return 0
+        except OSError:
+            self._drop(conn)
+            return 0
+        if not data:
+            self._drop(conn)  # Client hung up
+            return 0
+
+        state.inbox += data
+        try:
+            commands = state.frames()
+        except ValueError:
+            self._drop(conn)  # Garbage, the stream can't be trusted any more
+            return 0
+
+        if not state.authenticated and commands:
+            token = commands.pop(0).get('token')
+            if not (isinstance(token, str)
+                    and hmac.compare_digest(token.encode(), self._token)):
+                self._drop(conn)  # Not the daemon's user
+                return 0
+            state.authenticated = True
+
+        handled = 0
+        for cmd in commands:
+            if 'batch' in cmd:
+                response = {'results': [handler(c) for c in cmd['batch']]}
+                handled += len(cmd['batch'])
+            else:
+                response = handler(cmd)
+                handled += 1
+            if self._selector is None:
+                return handled  # A command shut the daemon down
+
+            frame = _dumps(response)
+            state.outbox += _HEADER.pack(len(frame)) + frame
+
+        if commands:
+            self._flush(conn, state)
+        return handled
+
+    def _flush(self, conn: socket.socket, state: _Connection):
         """
-        Send response to command (called by daemon)
-        
-        Args:
-            response: Response dictionary
+        Send queued replies
+
+        If they don't all fit in the socket buffer, stop reading from the
+        client and wait until it takes the rest (so a client that never reads
+        its replies can't make the daemon queue them without limit).
         """
         try:
-            with open(self.response_file, 'w') as f:
-                json.dump(response, f)
-        except Exception as e:
+            sent = conn.send(state.outbox)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError as e:
             print(f"Error writing response: {e}")
+            self._drop(conn)
+            return
+        del state.outbox[:sent]
+
+        events = selectors.EVENT_WRITE if state.outbox else selectors.EVENT_READ
+        if self._selector.get_key(conn).events != events:
+            self._selector.modify(conn, events, state)
+
+    def _drop(self, conn: socket.socket):
+        """Forget and close a client connection"""
+        if self._selector is not None:
+            try:
+                self._selector.unregister(conn)
+            except (KeyError, ValueError):
+                pass
+        conn.close()
+
+    def stop_server(self):
+        """Close all connections and remove the command socket (called by daemon)"""
+        if self._selector is None:
+            return
+
+        for key in list(self._selector.get_map().values()):
+            key.fileobj.close()
+        self._selector.close()
+        self._selector = None
+        self._listener = None
+        self._token = None
+
+        try:
+            if _USE_UNIX_SOCKET:
+                self.socket_path.unlink()
+            else:
+                self.port_file.unlink()
+        except FileNotFoundError:
+            pass
+
+
+_instance: Optional[DaemonCommands] = None
+
+
+def get_daemon() -> DaemonCommands:
+    """
+    Shared client for the default state directory
+
+    Connections are per thread, so one instance can be used from anywhere
+    in the process.
+    """
+    global _instance
+    if _instance is None:
+        _instance = DaemonCommands()
+    return _instance
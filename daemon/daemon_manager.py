@@ -3,7 +3,10 @@ Daemon PID and Lock File Management
 Handles singleton enforcement across all VS Code instances
 """
 import os
+import select
+import struct
 import sys
+import threading
 import time
 from pathlib import Path
 from typing import Optional, Tuple
@@ -11,45 +14,205 @@ from typing import Optional, Tuple
 # === SETUP VENDORED PACKAGES ===
 def setup_vendored_packages():
     """Add vendored packages to Python path"""
-    daemon_dir = Path(__file__).parent
-    vendor_dir = daemon_dir / "vendor"
-    if vendor_dir.exists():
-        for pkg in ["pyserial", "psutil", "mcp"]:
-            pkg_path = vendor_dir / pkg
-            if pkg_path.exists() and str(pkg_path) not in sys.path:
-                sys.path.insert(0, str(pkg_path))
+    # One directory read instead of a stat() per package
+    try:
+        entries = {e.name: e.path for e in os.scandir(Path(__file__).parent / "vendor")}
+    except FileNotFoundError:
+        return
+    paths = [entries[pkg] for pkg in ("pyserial", "mcp") if pkg in entries]
+    sys.path[:0] = [p for p in paths if p not in sys.path]
 
 setup_vendored_packages()
 
-import psutil
+import proc
+
+# Win32 LockFileEx flags/errors
+_LOCKFILE_FAIL_IMMEDIATELY = 0x1
+_LOCKFILE_EXCLUSIVE_LOCK = 0x2
+_ERROR_LOCK_VIOLATION = 33
+_WHOLE_FILE = 0xFFFFFFFF  # Low/high length words covering the entire file
+
+# === PLATFORM FILE LOCKING ===
+# _try_lock(fd) -> bool: exclusive, non-blocking lock (False if held elsewhere)
+# _unlock(fd): release it
+if sys.platform == 'win32':
+    import ctypes
+    import msvcrt
+    from ctypes import wintypes
+
+    class _OVERLAPPED(ctypes.Structure):
+        _fields_ = [
+            ('Internal', ctypes.c_void_p),
+            ('InternalHigh', ctypes.c_void_p),
+            ('Offset', wintypes.DWORD),
+            ('OffsetHigh', wintypes.DWORD),
+            ('hEvent', wintypes.HANDLE),
+        ]
+
+    _kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    _kernel32.LockFileEx.argtypes = (
+        wintypes.HANDLE, wintypes.DWORD, wintypes.DWORD,
+        wintypes.DWORD, wintypes.DWORD, ctypes.POINTER(_OVERLAPPED))
+    _kernel32.LockFileEx.restype = wintypes.BOOL
+    _kernel32.UnlockFileEx.argtypes = (
+        wintypes.HANDLE, wintypes.DWORD, wintypes.DWORD,
+        wintypes.DWORD, ctypes.POINTER(_OVERLAPPED))
+    _kernel32.UnlockFileEx.restype = wintypes.BOOL
+
+    def _try_lock(fd: int) -> bool:
+        """Windows: whole-file LockFileEx that fails instead of waiting"""
+        handle = msvcrt.get_osfhandle(fd)
+        if _kernel32.LockFileEx(handle, _LOCKFILE_EXCLUSIVE_LOCK | _LOCKFILE_FAIL_IMMEDIATELY,
+                                0, _WHOLE_FILE, _WHOLE_FILE, ctypes.byref(_OVERLAPPED())):
+            return True
+        error = ctypes.get_last_error()
+        if error != _ERROR_LOCK_VIOLATION:
+            raise ctypes.WinError(error)  # Not a lock held by another process
+        return False
+
+    def _unlock(fd: int):
+        """Windows: release the lock taken by _try_lock"""
+        handle = msvcrt.get_osfhandle(fd)
+        _kernel32.UnlockFileEx(handle, 0, _WHOLE_FILE, _WHOLE_FILE, ctypes.byref(_OVERLAPPED()))
+else:
+    import fcntl
+
+    def _try_lock(fd: int) -> bool:
+        """POSIX: non-blocking exclusive flock"""
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _unlock(fd: int):
+        """POSIX: release the lock taken by _try_lock"""
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+# === DIRECTORY CHANGE NOTIFICATION ===
+# Linux inotify through libc (no dependency); other platforms poll instead
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_IN_CREATE = 0x100
+_IN_MOVED_TO = 0x80  # atomic_write() renames the finished file into place
+
+if sys.platform.startswith('linux'):
+    import ctypes
+
+    _libc = ctypes.CDLL(None, use_errno=True)
+
+
+def _watch_new_files(directory: Path) -> Optional[int]:
+    """
+    Linux: inotify fd that becomes readable when a file appears in directory
+    
+    Returns:
+        The fd (caller closes it), or None if inotify isn't available
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        fd = _libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+    except AttributeError:
+        return None
+    if fd < 0:
+        return None
+    if _libc.inotify_add_watch(fd, os.fsencode(directory), _IN_CREATE | _IN_MOVED_TO) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+# State directory shared by the daemon and its clients, resolved once per process
+# (SERIAL_MONITOR_HOME overrides it, e.g. to run an isolated daemon for tests)
+DEFAULT_BASE_DIR = Path(os.environ.get("SERIAL_MONITOR_HOME") or (Path.home() / ".serial-monitor"))
+
+# Directories already created by this process
+_ensured_dirs = set()
+
+
+def ensure_dir(path: Path):
+    """
+    Create a directory (and parents) once per process
+    
+    Later calls for the same path are a set lookup instead of a mkdir syscall.
+    
+    Args:
+        path: Directory to create if missing
+    """
+    if path not in _ensured_dirs:
+        path.mkdir(parents=True, exist_ok=True)
+        _ensured_dirs.add(path)
+
+
+def atomic_write(path: Path, data: bytes, mode: int = 0o666):
+    """
+    Write a small file so readers never observe a partial file
+    
+    Writes to a temporary sibling, fsyncs it, then renames over the target
+    (os.replace is atomic on both POSIX and NTFS).
+    
+    Args:
+        path: Destination file
+        data: Full file contents
+        mode: Permission bits of a newly created file (before the umask)
+    """
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, 'wb', opener=lambda name, flags: os.open(name, flags, mode)) as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    try:
+        os.replace(tmp, path)
+    except PermissionError:
+        # Windows refuses to replace a file another process has open;
+        # fall back to rewriting it in place
+        os.unlink(tmp)
+        with open(path, 'wb') as f:
+            f.write(data)
 
 
 class DaemonManager:
     """Manages daemon singleton via PID file and file locking"""
     
+    # Binary PID record: magic, pid, start timestamp, reserved, port, session_id
+    # (strings NUL-padded; port sized for long /dev/serial/by-id/... paths)
+    _PID_FMT = struct.Struct("<4sIdQ128s64s")
+    _PID_MAGIC = b"SMPD"
+    
     def __init__(self, base_dir: Optional[Path] = None):
         """
         Initialize daemon manager with base directory for PID/lock files
         
         Args:
             base_dir: Directory to store daemon files. Defaults to ~/.serial-monitor/
+                      (or $SERIAL_MONITOR_HOME)
         """
-        if base_dir is None:
-            # System-wide location (not per-workspace)
-            home = Path.home()
-            base_dir = home / ".serial-monitor"
-        
-        self.base_dir = Path(base_dir)
+        # System-wide location (not per-workspace)
+        self.base_dir = DEFAULT_BASE_DIR if base_dir is None else Path(base_dir)
         self.pid_file = self.base_dir / "daemon.pid"
         self.lock_file = self.base_dir / "daemon.lock"
         self.log_file = self.base_dir / "daemon.log"
         self.db_file = self.base_dir / "serial_data.db"
         
         # Ensure directory exists
-        self.base_dir.mkdir(parents=True, exist_ok=True)
+        ensure_dir(self.base_dir)
         
         # Lock file handle (kept open while daemon runs)
         self._lock_handle = None
+        
+        # Process probe caches (health checks run repeatedly against one PID).
+        # Tool calls probe from several threads; the handle lock keeps one thread
+        # from closing the handle while another is waiting on it.
+        self._cached_pid: Optional[int] = None
+        self._proc_handle = None  # Windows SYNCHRONIZE handle for _cached_pid
+        self._proc_handle_lock = threading.Lock()
+        self._verified_pid: Optional[int] = None  # PID whose cmdline matched our daemon
+        
+        # Last parsed PID record as one ((inode, size, mtime), record) tuple, so
+        # a concurrent reader never pairs a new key with an old record
+        self._pid_cache: Optional[Tuple[Tuple[int, int, int], Tuple[int, float, str, str]]] = None
     
     def acquire_lock(self) -> bool:
         """
@@ -63,27 +226,13 @@ class DaemonManager:
             self._lock_handle = open(self.lock_file, 'w')
             
             # Try to acquire exclusive lock
-            if sys.platform == 'win32':
-                import msvcrt
-                try:
-                    # Lock first byte, non-blocking
-                    msvcrt.locking(self._lock_handle.fileno(), msvcrt.LK_NBLCK, 1)
-                    return True
-                except OSError:
-                    # Lock held by another process
-                    self._lock_handle.close()
-                    self._lock_handle = None
-                    return False
-            else:
-                import fcntl
-                try:
-                    # Non-blocking exclusive lock
-                    fcntl.flock(self._lock_handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
-                    return True
-                except BlockingIOError:
-                    self._lock_handle.close()
-                    self._lock_handle = None
-                    return False
+            if _try_lock(self._lock_handle.fileno()):
+                return True
+            
+            # Lock held by another process
+            self._lock_handle.close()
+            self._lock_handle = None
+            return False
         except Exception as e:
             print(f"Error acquiring lock: {e}", file=sys.stderr)
             if self._lock_handle:
@@ -95,13 +244,7 @@ class DaemonManager:
         """Release file lock and close handle"""
         if self._lock_handle:
             try:
-                if sys.platform == 'win32':
-                    import msvcrt
-                    # Unlock first byte
-                    msvcrt.locking(self._lock_handle.fileno(), msvcrt.LK_UNLCK, 1)
-                else:
-                    import fcntl
-                    fcntl.flock(self._lock_handle, fcntl.LOCK_UN)
+                _unlock(self._lock_handle.fileno())
             except Exception:
                 pass  # Best effort
             finally:
@@ -110,20 +253,15 @@ class DaemonManager:
         
         # Remove lock file
         try:
-            if self.lock_file.exists():
-                self.lock_file.unlink()
-        except Exception:
-            pass  # Best effort
+            os.unlink(self.lock_file)
+        except OSError:
+            pass  # Best effort (already gone, or still open elsewhere)
     
     def write_pid(self, port: str = "COM9", session_id: Optional[str] = None):
         """
         Write current process PID to file
         
-        Format:
-            <PID>
-            <timestamp>
-            <port>
-            <session_id>
+        Format: fixed-size binary record (see _PID_FMT)
         
         Args:
             port: Serial port being monitored
@@ -133,12 +271,14 @@ class DaemonManager:
         timestamp = time.time()
         session_id = session_id or f"session_{int(timestamp)}"
         
+        port_bytes = port.encode('utf-8')
+        session_bytes = session_id.encode('utf-8')
+        if len(port_bytes) > 128 or len(session_bytes) > 64:
+            raise ValueError(f"Port or session ID too long for PID record: {port!r}, {session_id!r}")
+        
         try:
-            with open(self.pid_file, 'w') as f:
-                f.write(f"{pid}\n")
-                f.write(f"{timestamp}\n")
-                f.write(f"{port}\n")
-                f.write(f"{session_id}\n")
+            record = self._PID_FMT.pack(self._PID_MAGIC, pid, timestamp, 0, port_bytes, session_bytes)
+            atomic_write(self.pid_file, record)
         except Exception as e:
             print(f"Error writing PID file: {e}", file=sys.stderr)
             raise
@@ -150,29 +290,40 @@ class DaemonManager:
         Returns:
             Tuple of (pid, timestamp, port, session_id) or None if file doesn't exist
         """
-        if not self.pid_file.exists():
-            return None
-        
         try:
-            with open(self.pid_file, 'r') as f:
-                lines = f.readlines()
-                if len(lines) >= 4:
-                    pid = int(lines[0].strip())
-                    timestamp = float(lines[1].strip())
-                    port = lines[2].strip()
-                    session_id = lines[3].strip()
-                    return (pid, timestamp, port, session_id)
-        except Exception as e:
+            # write_pid() always replaces the file, so an unchanged stat means
+            # the record we parsed last time is still current
+            st = os.stat(self.pid_file)
+            key = (st.st_ino, st.st_size, st.st_mtime_ns)
+            cached = self._pid_cache
+            if cached is not None and cached[0] == key:
+                return cached[1]
+            
+            data = self.pid_file.read_bytes()
+            if len(data) == self._PID_FMT.size and data.startswith(self._PID_MAGIC):
+                _, pid, timestamp, _, port, session_id = self._PID_FMT.unpack(data)
+                record = (pid, timestamp, port.rstrip(b"\0").decode('utf-8'),
+                          session_id.rstrip(b"\0").decode('utf-8'))
+            else:
+                # Text format written by older daemons
+                pid, timestamp, port, session_id, *_ = data.decode('utf-8').split("\n", 4)
+                record = (int(pid), float(timestamp), port.strip(), session_id.strip())
+            
+            self._pid_cache = (key, record)
+            return record
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
             print(f"Error reading PID file: {e}", file=sys.stderr)
-        
-        return None
+            return None
     
     def remove_pid(self):
         """Remove PID file"""
         try:
-            if self.pid_file.exists():
-                self.pid_file.unlink()
-        except Exception as e:
+            os.unlink(self.pid_file)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
             print(f"Error removing PID file: {e}", file=sys.stderr)
     
     def is_process_running(self, pid: int) -> bool:
@@ -185,10 +336,54 @@ class DaemonManager:
         Returns:
             True if process exists, False otherwise
         """
-        try:
-            return psutil.pid_exists(pid)
-        except Exception:
-            return False
+        if sys.platform == 'win32' and pid > 0:
+            return self._win_process_running(pid)
+        
+        return proc.pid_exists(pid)
+    
+    def _win_process_running(self, pid: int) -> bool:
+        """
+        Windows process probe using a cached SYNCHRONIZE handle
+        
+        The handle refers to the original process even if the PID is later
+        reused, so an exited daemon is never mistaken for a new process.
+        """
+        with self._proc_handle_lock:
+            if pid != self._cached_pid:
+                if self._proc_handle:
+                    proc.close_handle(self._proc_handle)
+                self._proc_handle = proc.open_process(pid, proc.SYNCHRONIZE)
+                self._cached_pid = pid
+                if not self._proc_handle:
+                    # Gone, or not ours to open - let the uncached probe decide
+                    self._cached_pid = None
+                    return proc.pid_exists(pid)
+            
+            return proc.handle_running(self._proc_handle)
+    
+    def _is_daemon_process(self, pid: int) -> bool:
+        """
+        Check that a live PID really is our daemon (cmdline checked once per PID)
+        
+        Args:
+            pid: Process ID recorded in the PID file
+        
+        Returns:
+            True if the process looks like the serial daemon
+        """
+        if pid == self._verified_pid:
+            return True
+        
+        args = proc.cmdline(pid)
+        if args is None:
+            # Can't inspect it - assume it's ours rather than delete a live daemon's files
+            return True
+        
+        cmdline = ' '.join(args)
+        if 'serial_daemon' in cmdline or 'python' in cmdline.lower():
+            self._verified_pid = pid
+            return True
+        return False
     
     def cleanup_stale_files(self) -> bool:
         """
@@ -200,33 +395,24 @@ class DaemonManager:
         pid_data = self.read_pid()
         
         if pid_data is None:
-            # No PID file, check for orphaned lock
-            if self.lock_file.exists():
-                # Check if lock file is old (>5 minutes)
-                try:
-                    mtime = self.lock_file.stat().st_mtime
-                    age = time.time() - mtime
-                    if age > 300:  # 5 minutes
-                        print(f"Removing orphaned lock file (age: {age:.0f}s)")
-                        self.lock_file.unlink()
-                        return True
-                except Exception as e:
-                    print(f"Error checking lock file: {e}", file=sys.stderr)
+            # No PID file, check for orphaned lock (>5 minutes old)
+            try:
+                age = time.time() - os.stat(self.lock_file).st_mtime
+                if age > 300:  # 5 minutes
+                    print(f"Removing orphaned lock file (age: {age:.0f}s)")
+                    os.unlink(self.lock_file)
+            except FileNotFoundError:
+                pass  # No lock file, or another process removed it first
+            except OSError as e:
+                print(f"Error checking lock file: {e}", file=sys.stderr)
             return True
         
         pid, timestamp, port, session_id = pid_data
         
-        # Check if process exists
-        if self.is_process_running(pid):
-            # Process exists, check if it's actually our daemon
-            try:
-                proc = psutil.Process(pid)
-                cmdline = ' '.join(proc.cmdline())
-                if 'serial_daemon' in cmdline or 'python' in cmdline.lower():
-                    # Looks like our daemon, don't clean up
-                    return False
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                pass
+        # Check if process exists and is actually our daemon
+        if self.is_process_running(pid) and self._is_daemon_process(pid):
+            # Looks like our daemon, don't clean up
+            return False
         
         # Process doesn't exist or isn't our daemon - clean up
         print(f"Cleaning up stale files from PID {pid}")
@@ -234,9 +420,10 @@ class DaemonManager:
         
         # Try to remove lock file
         try:
-            if self.lock_file.exists():
-                self.lock_file.unlink()
-        except Exception as e:
+            os.unlink(self.lock_file)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
             print(f"Error removing lock file: {e}", file=sys.stderr)
         
         return True
@@ -263,6 +450,40 @@ class DaemonManager:
         
         return True
     
+    def wait_for_daemon(self, timeout: float = 5.0) -> bool:
+        """
+        Wait for a starting daemon to pass check_daemon_health()
+        
+        On Linux this sleeps until a file is created in the daemon directory
+        (the PID file appears); elsewhere it polls with exponential backoff,
+        1 ms doubling up to 100 ms, so a fast start isn't rounded up to a
+        long sleep.
+        
+        Args:
+            timeout: Maximum seconds to wait
+        
+        Returns:
+            True if the daemon is up, False on timeout
+        """
+        deadline = time.monotonic() + timeout
+        # Watch before the first check, so a PID file written in between isn't missed
+        fd = _watch_new_files(self.base_dir)
+        delay = 0.001
+        try:
+            while not self.check_daemon_health():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                if fd is None:
+                    time.sleep(min(delay, remaining))
+                    delay = min(delay * 2, 0.1)
+                elif select.select([fd], [], [], remaining)[0]:
+                    os.read(fd, 4096)  # Drain the events, any new file is worth a check
+            return True
+        finally:
+            if fd is not None:
+                os.close(fd)
+    
     def get_daemon_info(self) -> Optional[dict]:
         """
         Get information about running daemon
@@ -2,18 +2,126 @@
 SQLite Database Manager for Serial Data
 Handles concurrent access, WAL mode, write batching, corruption recovery, auto-cleanup
 """
+import queue
 import sqlite3
 import time
+from collections import Counter
 from pathlib import Path
-from typing import List, Dict, Optional, Any
-from threading import Lock, Thread, Event
-from datetime import datetime
+from typing import List, Dict, Iterator, Optional, Any
+from threading import RLock, Thread, Event, current_thread
+from datetime import datetime, timedelta, timezone
+
+# Write queue marker telling the writer thread to exit (after writing everything before it)
+_STOP = object()
+
+# Statement actions allowed on the read connection (anything else is denied by SQLite)
+_READ_ACTIONS = frozenset({
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    sqlite3.SQLITE_RECURSIVE,  # WITH RECURSIVE
+})
+
+
+def _read_only_authorizer(action: int, *args) -> int:
+    """sqlite3 authorizer: allow reads, deny every other statement action"""
+    return sqlite3.SQLITE_OK if action in _READ_ACTIONS else sqlite3.SQLITE_DENY
+
+
+# Statements that can possibly be queries, checked before SQLite sees the text
+_QUERY_PREFIXES = ("SELECT", "WITH")
+
+
+# Lines are stored in serial_lines with port and session names moved to small
+# dimension tables; the serial_data view keeps the original row shape for queries
+# (timestamp = microseconds since the Unix epoch)
+_SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS ports (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    );
+    CREATE TABLE IF NOT EXISTS sessions (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE,
+        line_count INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS serial_lines (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp INTEGER NOT NULL,
+        port_id INTEGER NOT NULL REFERENCES ports(id),
+        data TEXT NOT NULL,
+        session_id INTEGER NOT NULL REFERENCES sessions(id)
+    );
+"""
+
+_VIEW_SQL = """
+    CREATE VIEW IF NOT EXISTS serial_data AS
+    SELECT l.id, l.timestamp, p.name AS port, l.data, s.name AS session_id
+    FROM serial_lines l
+    JOIN ports p ON p.id = l.port_id
+    JOIN sessions s ON s.id = l.session_id
+"""
+
+_INSERT_SQL = "INSERT INTO serial_lines (timestamp, port_id, data, session_id) VALUES (?, ?, ?, ?)"
+
+# sessions.line_count is maintained by the writer (added on insert, subtracted on cleanup)
+_COUNT_SESSION_SQL = "UPDATE sessions SET line_count = line_count + ? WHERE id = ?"
+_RECOUNT_SESSIONS_SQL = (
+    "UPDATE sessions SET line_count ="
+    " (SELECT COUNT(*) FROM serial_lines WHERE session_id = sessions.id)"
+)
+
+# Newest-first selects, keyed on (filter by port, filter by session); serial_lines
+# drives the scan and names are looked up per returned row
+_SELECT_NEWEST = {
+    (by_port, by_session): (
+        "SELECT l.id, l.timestamp,"
+        " (SELECT name FROM ports WHERE id = l.port_id) AS port, l.data,"
+        " (SELECT name FROM sessions WHERE id = l.session_id) AS session_id"
+        " FROM serial_lines l WHERE 1=1"
+        + (" AND l.port_id = (SELECT id FROM ports WHERE name = ?)" if by_port else "")
+        + (" AND l.session_id = (SELECT id FROM sessions WHERE name = ?)" if by_session else "")
+        + " ORDER BY l.id DESC"
+    )
+    for by_port in (False, True)
+    for by_session in (False, True)
+}
+_SELECT_TAIL = {key: sql + " LIMIT ?" for key, sql in _SELECT_NEWEST.items()}
+
+
+def _is_corruption(error: sqlite3.Error) -> bool:
+    """True for errors that mean the database file is damaged (not e.g. locked)"""
+    message = str(error).lower()
+    return "corrupt" in message or "malformed" in message or "not a database" in message
+
+
+def _filter_params(port: Optional[str], session_id: Optional[str]) -> tuple:
+    """Parameters for a _SELECT_NEWEST/_SELECT_TAIL query"""
+    if port:
+        return (port, session_id) if session_id else (port,)
+    return (session_id,) if session_id else ()
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_US = timedelta(microseconds=1)
+
+
+def _iso_to_us(value) -> int:
+    """Convert a local-time ISO-8601 timestamp (old schema) to epoch microseconds"""
+    if isinstance(value, int):
+        return value
+    try:
+        local = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return 0  # Unparseable, keep the row anyway
+    return (local.astimezone(timezone.utc) - _EPOCH) // _US
 
 
 class DatabaseManager:
     """Manages SQLite database for serial data with concurrency support"""
     
-    def __init__(self, db_path: Path, max_records: int = 10000, cleanup_interval: int = 60):
+    def __init__(self, db_path: Path, max_records: int = 10000, cleanup_interval: int = 60,
+                 read_only: bool = False):
         """
         Initialize database manager
         
@@ -21,82 +129,107 @@ class DatabaseManager:
             db_path: Path to SQLite database file
             max_records: Maximum records to keep (default 10,000)
             cleanup_interval: Seconds between cleanup runs (default 60)
+            read_only: Only query a database the daemon writes (no schema setup,
+                       writer or cleanup threads; the database must exist)
         """
         self.db_path = Path(db_path)
-        self.connection = None
-        self.write_lock = Lock()
-        self.write_buffer = []
+        self.read_only = read_only
+        self.connection = None  # Writes only (inserts, cleanup)
+        self.read_connection = None  # Read-only, used by query()/get_*()
+        self.write_lock = RLock()  # Serializes use of the write connection
+        self.write_queue = queue.SimpleQueue()  # Rows from insert(), drained by the writer thread
         self.buffer_size = 100  # Batch writes every 100 lines
-        self.last_commit = time.time()
         self.commit_interval = 1.0  # Or every 1 second
+        self.flush_window = 0.01  # Coalesce immediate inserts arriving within 10 ms
+        self.writer_thread: Optional[Thread] = None
         
         # Cleanup settings
         self.max_records = max_records
         self.cleanup_interval = cleanup_interval
         self.cleanup_thread: Optional[Thread] = None
         self.cleanup_stop_event = Event()
+        self._rows_inserted = 0  # Total written by this instance (for the cleanup rate)
+        
+        if read_only:
+            self._open_read_connection()
+            return
         
         # Initialize database
         self._init_database()
         
-        # Start cleanup task
+        # Start writer and cleanup tasks
+        self._start_writer_task()
         self._start_cleanup_task()
     
+    @staticmethod
+    def _open_conn(db_path: Path) -> sqlite3.Connection:
+        """Open the write connection and apply the connection settings"""
+        # Create database file if doesn't exist
+        connection = sqlite3.connect(
+            db_path,
+            check_same_thread=False,  # Allow multi-threaded access
+            timeout=10.0,  # 10 second busy timeout
+            isolation_level=None  # No implicit BEGIN, transactions are explicit
+        )
+        
+        # Free pages are returned to the OS a bit at a time by cleanup
+        # (only takes effect on a new database, see _enable_incremental_vacuum)
+        connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        connection.execute("PRAGMA page_size = 4096")  # Also new databases only
+        
+        # Enable WAL mode for concurrent reads/writes
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute("PRAGMA cache_size = -65536")  # 64 MiB (negative = KiB)
+        connection.execute("PRAGMA busy_timeout = 5000")
+        connection.execute("PRAGMA wal_autocheckpoint = 1000")  # Pages
+        
+        # Serve reads from a memory map and keep temp b-trees (ORDER BY, COUNT) in RAM
+        connection.execute("PRAGMA mmap_size = 268435456")  # 256 MiB
+        connection.execute("PRAGMA temp_store = MEMORY")
+        connection.execute("PRAGMA trusted_schema = OFF")
+        return connection
+    
     def _init_database(self):
         """Initialize database with schema and settings"""
         try:
-            # Create database file if doesn't exist
-            self.connection = sqlite3.connect(
-                str(self.db_path),
-                check_same_thread=False,  # Allow multi-threaded access
-                timeout=10.0  # 10 second busy timeout
-            )
-            
-            # Enable WAL mode for concurrent reads/writes
-            self.connection.execute("PRAGMA journal_mode = WAL")
-            self.connection.execute("PRAGMA synchronous = NORMAL")
-            self.connection.execute("PRAGMA cache_size = 10000")
-            self.connection.execute("PRAGMA busy_timeout = 5000")
+            self.connection = self._open_conn(self.db_path)
             
             # Create schema
+            self._dim_ids = {'ports': {}, 'sessions': {}}  # Ids belong to this database file
+            self.connection.executescript(_SCHEMA_SQL)
+            self._migrate_legacy_table()
+            self._add_session_counts()
+            self.connection.execute(_VIEW_SQL)
+            
+            # Create indexes for fast queries (time ranges use the rowid order
+            # instead of a timestamp index, see get_recent)
             self.connection.execute("""
-                CREATE TABLE IF NOT EXISTS serial_data (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    port TEXT NOT NULL,
-                    data TEXT NOT NULL,
-                    session_id TEXT NOT NULL
-                )
+                CREATE INDEX IF NOT EXISTS idx_lines_port 
+                ON serial_lines(port_id)
             """)
             
-            # Create indexes for fast queries
             self.connection.execute("""
-                CREATE INDEX IF NOT EXISTS idx_timestamp 
-                ON serial_data(timestamp)
+                CREATE INDEX IF NOT EXISTS idx_lines_session 
+                ON serial_lines(session_id)
             """)
             
-            self.connection.execute("""
-                CREATE INDEX IF NOT EXISTS idx_port 
-                ON serial_data(port)
-            """)
+            self.connection.commit()
             
-            self.connection.execute("""
-                CREATE INDEX IF NOT EXISTS idx_session 
-                ON serial_data(session_id)
-            """)
+            # Counted once here, then kept up to date by the write path
+            self._row_count = self.connection.execute(
+                "SELECT COUNT(*) FROM serial_lines"
+            ).fetchone()[0]
             
-            self.connection.execute("""
-                CREATE INDEX IF NOT EXISTS idx_composite 
-                ON serial_data(timestamp, port)
-            """)
-            
-            self.connection.commit()
+            self._enable_incremental_vacuum()
+            self._open_read_connection()
             
             print(f"Database initialized at {self.db_path}")
             
         except sqlite3.Error as e:
             print(f"Database initialization error: {e}")
-            # Attempt corruption recovery
+            if not _is_corruption(e):
+                raise  # Busy, permissions...: the file itself is fine, keep it
             self._recover_from_corruption()
     
     def _recover_from_corruption(self):
@@ -104,31 +237,32 @@ class DatabaseManager:
         print("Attempting database corruption recovery...")
         
         try:
-            # Close existing connection
+            # Close existing connections
+            if self.read_connection:
+                self.read_connection.close()
+                self.read_connection = None
             if self.connection:
                 self.connection.close()
             
-            # Rename corrupted database
+            # Rename corrupted database, with its WAL so the new database
+            # doesn't pick it up
             timestamp = int(time.time())
             backup_path = self.db_path.with_suffix(f'.corrupt.{timestamp}.db')
             
             if self.db_path.exists():
                 self.db_path.rename(backup_path)
                 print(f"Corrupted database moved to: {backup_path}")
+            for suffix in ('-wal', '-shm'):
+                sidecar = self.db_path.with_name(self.db_path.name + suffix)
+                if sidecar.exists():
+                    sidecar.rename(backup_path.with_name(backup_path.name + suffix))
             
-            # Create new database
-            self.connection = sqlite3.connect(
-                str(self.db_path),
-                check_same_thread=False,
-                timeout=10.0
-            )
-            
-            # Re-initialize schema
+            # Create new database (opens the connection and creates the schema)
             self._init_database()
             
             # Log recovery event
             self.insert_immediate(
-                timestamp=datetime.now().isoformat(),
+                timestamp=time.time_ns() // 1000,
                 port="SYSTEM",
                 data="DATABASE_RECOVERED_FROM_CORRUPTION",
                 session_id="recovery"
@@ -140,6 +274,116 @@ class DatabaseManager:
             print(f"Database recovery failed: {e}")
             raise
     
+    def _migrate_legacy_table(self):
+        """
+        Move rows from the serial_data table of older versions into serial_lines
+        
+        Handles both ISO-8601 TEXT and integer timestamps; serial_data is
+        replaced by the view afterwards.
+        """
+        self.connection.commit()
+        self.connection.execute("BEGIN IMMEDIATE")  # Another process may be migrating too
+        try:
+            row = self.connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'serial_data'"
+            ).fetchone()
+            if row is None:
+                self.connection.rollback()
+                return
+            
+            print("Migrating serial_data to serial_lines (port/session tables, integer timestamps)...")
+            self.connection.create_function("iso_to_us", 1, _iso_to_us, deterministic=True)
+            self.connection.execute("INSERT OR IGNORE INTO ports (name) SELECT DISTINCT port FROM serial_data")
+            self.connection.execute("INSERT OR IGNORE INTO sessions (name) SELECT DISTINCT session_id FROM serial_data")
+            self.connection.execute("""
+                INSERT INTO serial_lines (id, timestamp, port_id, data, session_id)
+                SELECT d.id, iso_to_us(d.timestamp), p.id, d.data, s.id
+                FROM serial_data d
+                JOIN ports p ON p.name = d.port
+                JOIN sessions s ON s.name = d.session_id
+            """)
+            self.connection.execute(_RECOUNT_SESSIONS_SQL)
+            self.connection.execute("DROP TABLE serial_data")  # Drops the old indexes too
+            self.connection.commit()
+        except sqlite3.Error:
+            self.connection.rollback()
+            raise
+    
+    def _add_session_counts(self):
+        """Add and fill sessions.line_count on databases created without it"""
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.connection.execute(
+                "SELECT 1 FROM pragma_table_info('sessions') WHERE name = 'line_count'"
+            ).fetchone()
+            if row is None:
+                self.connection.execute(
+                    "ALTER TABLE sessions ADD COLUMN line_count INTEGER NOT NULL DEFAULT 0"
+                )
+                self.connection.execute(_RECOUNT_SESSIONS_SQL)
+            self.connection.commit()
+        except sqlite3.Error:
+            self.connection.rollback()
+            raise
+    
+    def _dim_id(self, table: str, name: str) -> int:
+        """
+        Id of a port/session name, adding it on first use (called with lock held)
+        
+        Cached per process, so steady-state inserts don't touch the dimension tables.
+        """
+        ids = self._dim_ids[table]
+        dim_id = ids.get(name)
+        if dim_id is None:
+            self.connection.execute(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", (name,))
+            dim_id = self.connection.execute(
+                f"SELECT id FROM {table} WHERE name = ?", (name,)
+            ).fetchone()[0]
+            ids[name] = dim_id
+        return dim_id
+    
+    def _forget_dim_ids(self):
+        """Drop cached ids after a rollback (new names may not have been committed)"""
+        for ids in self._dim_ids.values():
+            ids.clear()
+    
+    def _open_read_connection(self):
+        """
+        Open the read-only connection used for queries
+        
+        In WAL mode readers only run concurrently with the writer on a separate
+        connection; row_factory is set once here and never changed.
+        """
+        if self.read_connection:
+            self.read_connection.close()
+        
+        self.read_connection = sqlite3.connect(
+            f"{self.db_path.resolve().as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            timeout=10.0,
+            cached_statements=256  # get_recent/get_tail SQL stays prepared between calls
+        )
+        self.read_connection.row_factory = sqlite3.Row
+        
+        # Reads are the hot path for agent polling: memory-mapped pages, a large
+        # page cache and in-memory temp b-trees, set once per connection
+        self.read_connection.execute("PRAGMA mmap_size = 268435456")  # 256 MiB
+        self.read_connection.execute("PRAGMA cache_size = -65536")  # 64 MiB
+        self.read_connection.execute("PRAGMA temp_store = MEMORY")
+        self.read_connection.execute("PRAGMA query_only = ON")
+        
+        # Enforce SELECT-only at prepare time (install after any pragmas)
+        self.read_connection.set_authorizer(_read_only_authorizer)
+    
+    def _enable_incremental_vacuum(self):
+        """Convert a database created without auto_vacuum (one-time full VACUUM)"""
+        mode = self.connection.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if mode != 2:  # 2 = INCREMENTAL
+            print("Converting database to incremental auto-vacuum (one-time VACUUM)...")
+            self.connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            self.connection.execute("VACUUM")
+    
     def check_integrity(self) -> bool:
         """
         Check database integrity
@@ -155,72 +399,117 @@ class DatabaseManager:
             print(f"Integrity check failed: {e}")
             return False
     
-    def insert(self, timestamp: str, port: str, data: str, session_id: str):
+    def insert(self, timestamp: int, port: str, data: str, session_id: str):
         """
-        Buffer data for batched insert (non-blocking)
+        Queue data for batched insert (non-blocking, no lock)
         
         Args:
-            timestamp: ISO format timestamp
+            timestamp: Microseconds since the Unix epoch
             port: Serial port name
             data: Data line from serial port
             session_id: Current session identifier
         """
-        with self.write_lock:
-            self.write_buffer.append((timestamp, port, data, session_id))
-            
-            # Check if should commit
-            should_commit = (
-                len(self.write_buffer) >= self.buffer_size or
-                time.time() - self.last_commit >= self.commit_interval
-            )
-            
-            if should_commit:
-                self._flush_buffer()
+        self.write_queue.put_nowait((timestamp, port, data, session_id))
     
-    def insert_immediate(self, timestamp: str, port: str, data: str, session_id: str):
+    def insert_immediate(self, timestamp: int, port: str, data: str, session_id: str):
         """
         Insert data immediately without buffering (for important events)
         
+        The row is queued like insert() and followed by a flush marker, so the
+        writer thread commits it together with anything already queued instead
+        of competing for the write lock.
+        
         Args:
-            timestamp: ISO format timestamp
+            timestamp: Microseconds since the Unix epoch
             port: Serial port name
             data: Data line from serial port
             session_id: Current session identifier
         """
-        with self.write_lock:
-            try:
-                self.connection.execute(
-                    "INSERT INTO serial_data (timestamp, port, data, session_id) VALUES (?, ?, ?, ?)",
-                    (timestamp, port, data, session_id)
-                )
-                self.connection.commit()
-            except sqlite3.Error as e:
-                print(f"Immediate insert error: {e}")
-                # Try to recover
-                if "corrupt" in str(e).lower():
-                    self._recover_from_corruption()
-    
-    def _flush_buffer(self):
-        """Flush write buffer to database (called with lock held)"""
-        if not self.write_buffer:
+        row = (timestamp, port, data, session_id)
+        writer = self.writer_thread
+        if writer is None or writer is current_thread() or not writer.is_alive():
+            # No writer thread to hand off to (startup, recovery, after close)
+            with self.write_lock:
+                self._write_rows([row])
             return
         
+        self.write_queue.put_nowait(row)
+        self.flush()
+    
+    def _writer_task(self):
+        """
+        Background task that drains the write queue
+        
+        Rows are written in one transaction per batch: up to buffer_size rows, or
+        whatever arrived within commit_interval of the first one. A flush()
+        marker (also sent by insert_immediate) cuts the batch short, after
+        flush_window more for anything queued right behind it, so a burst of
+        immediate inserts shares one commit.
+        """
+        batch = []
+        while True:
+            item = self.write_queue.get()
+            deadline = time.monotonic() + self.commit_interval
+            flushed = []
+            
+            # Collect the rest of the batch
+            while item is not _STOP:
+                if isinstance(item, Event):
+                    flushed.append(item)
+                    deadline = min(deadline, time.monotonic() + self.flush_window)
+                else:
+                    batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.buffer_size or remaining <= 0:
+                    break
+                try:
+                    item = self.write_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            
+            if batch:
+                with self.write_lock:
+                    if self._write_rows(batch):
+                        batch = []
+                    # else: keep the rows and retry with the next batch
+            
+            for done in flushed:
+                done.set()
+            if item is _STOP:
+                return
+    
+    def _write_rows(self, rows: list) -> bool:
+        """
+        Insert a batch of rows in one transaction (called with lock held)
+        
+        Returns:
+            True if the rows were committed
+        """
         try:
             # Begin transaction
-            self.connection.execute("BEGIN")
+            # (IMMEDIATE takes the write lock up front instead of upgrading
+            # on the first INSERT, which can fail with SQLITE_BUSY)
+            self.connection.execute("BEGIN IMMEDIATE")
             
-            # Batch insert
+            # Batch insert (port/session names map to their dimension ids)
+            dim_id = self._dim_id
+            self.connection.executemany(
+                _INSERT_SQL,
+                ((ts, dim_id('ports', port), data, dim_id('sessions', session))
+                 for ts, port, data, session in rows)
+            )
+            session_ids = self._dim_ids['sessions']
             self.connection.executemany(
-                "INSERT INTO serial_data (timestamp, port, data, session_id) VALUES (?, ?, ?, ?)",
-                self.write_buffer
+                _COUNT_SESSION_SQL,
+                [(n, session_ids[session]) for session, n in
+                 Counter(row[3] for row in rows).items()]
             )
             
             # Commit transaction
-            self.connection.commit()
-            
-            # Clear buffer
-            self.write_buffer.clear()
-            self.last_commit = time.time()
+            self.connection.execute("COMMIT")
+            self._row_count += len(rows)
+            self._rows_inserted += len(rows)
+            return True
             
         except sqlite3.Error as e:
             print(f"Batch insert error: {e}")
@@ -230,15 +519,24 @@ class DatabaseManager:
                 self.connection.rollback()
             except Exception:
                 pass
+            self._forget_dim_ids()
             
             # Check for corruption
-            if "corrupt" in str(e).lower() or "malformed" in str(e).lower():
+            if _is_corruption(e):
                 self._recover_from_corruption()
+            return False
     
-    def flush(self):
-        """Force flush of write buffer (call before shutdown)"""
-        with self.write_lock:
-            self._flush_buffer()
+    def flush(self, timeout: float = 5.0):
+        """
+        Wait until everything inserted so far has been written
+        
+        Args:
+            timeout: Maximum seconds to wait for the writer thread
+        """
+        if self.writer_thread and self.writer_thread.is_alive():
+            done = Event()
+            self.write_queue.put(done)
+            done.wait(timeout)
     
     def query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
         """
@@ -251,30 +549,45 @@ class DatabaseManager:
         Returns:
             List of result rows as dictionaries
         """
-        # Validate query is SELECT only
-        sql_upper = sql.strip().upper()
-        if not sql_upper.startswith("SELECT"):
-            raise ValueError("Only SELECT queries allowed")
+        return [dict(row) for row in self.iter_query(sql, params)]
+    
+    def iter_query(self, sql: str, params: tuple = (),
+                   batch_size: int = 1000) -> Iterator[sqlite3.Row]:
+        """
+        Execute SELECT query and yield rows as they are stepped
         
-        # Forbidden keywords
-        forbidden = ["DELETE", "UPDATE", "INSERT", "DROP", "ALTER", "CREATE"]
-        for keyword in forbidden:
-            if keyword in sql_upper:
-                raise ValueError(f"Query contains forbidden keyword: {keyword}")
+        Rows are sqlite3.Row (indexable by name or position), fetched
+        batch_size at a time, so a caller that stops early doesn't pay for the rest.
+        Close the generator when stopping early to release the cursor.
+        
+        Args:
+            sql: SQL SELECT statement
+            params: Query parameters
+            batch_size: Rows stepped per fetchmany() call
+        """
+        # Cheap reject for anything that isn't even shaped like a query; the
+        # read connection's authorizer enforces SELECT-only for the rest
+        if not sql.lstrip()[:6].upper().startswith(_QUERY_PREFIXES):
+            raise ValueError("Only SELECT queries allowed")
         
         try:
-            # Use row factory for dict results
-            self.connection.row_factory = sqlite3.Row
-            cursor = self.connection.execute(sql, params)
-            
-            # Convert to list of dicts
-            results = [dict(row) for row in cursor.fetchall()]
-            
-            # Reset row factory
-            self.connection.row_factory = None
-            
-            return results
-            
+            cursor = self.read_connection.execute(sql, params)
+            cursor.arraysize = batch_size
+            try:
+                while True:
+                    rows = cursor.fetchmany()
+                    if not rows:
+                        break
+                    yield from rows
+            finally:
+                cursor.close()
+            
+        except sqlite3.DatabaseError as e:
+            # (writes to the serial_data view fail before the authorizer runs)
+            if "not authorized" in str(e) or "because it is a view" in str(e):
+                raise ValueError("Only SELECT queries allowed") from e
+            print(f"Query error: {e}")
+            raise
         except sqlite3.Error as e:
             print(f"Query error: {e}")
             raise
@@ -294,24 +607,30 @@ class DatabaseManager:
             List of recent data rows
         """
         # Calculate timestamp threshold
-        threshold = datetime.fromtimestamp(time.time() - seconds).isoformat()
-        
-        # Build query
-        sql = "SELECT * FROM serial_data WHERE timestamp >= ?"
-        params = [threshold]
+        threshold = time.time_ns() // 1000 - int(seconds * 1_000_000)
         
-        if port:
-            sql += " AND port = ?"
-            params.append(port)
+        sql = _SELECT_NEWEST[bool(port), bool(session_id)]
+        params = _filter_params(port, session_id)
         
-        if session_id:
-            sql += " AND session_id = ?"
-            params.append(session_id)
-        
-        sql += " ORDER BY id DESC LIMIT ?"
-        params.append(limit)
+        # Rows are inserted in time order, so walk them newest-first by rowid and
+        # stop at the first one older than the threshold (no timestamp index needed)
+        results = []
+        if limit <= 0:
+            return results
         
-        return self.query(sql, tuple(params))
+        # Small batches: the walk usually stops well before the limit
+        rows = self.iter_query(sql, params, batch_size=min(limit, 64))
+        try:
+            for row in rows:
+                if row['timestamp'] < threshold:
+                    break
+                results.append(dict(row))
+                if len(results) >= limit:
+                    break
+        finally:
+            rows.close()
+        
+        return results
     
     def get_tail(self, lines: int = 100, port: Optional[str] = None,
                  session_id: Optional[str] = None) -> List[Dict[str, Any]]:
@@ -326,21 +645,8 @@ class DatabaseManager:
         Returns:
             List of last N data rows
         """
-        sql = "SELECT * FROM serial_data WHERE 1=1"
-        params = []
-        
-        if port:
-            sql += " AND port = ?"
-            params.append(port)
-        
-        if session_id:
-            sql += " AND session_id = ?"
-            params.append(session_id)
-        
-        sql += " ORDER BY id DESC LIMIT ?"
-        params.append(lines)
-        
-        return self.query(sql, tuple(params))
+        sql = _SELECT_TAIL[bool(port), bool(session_id)]
+        return self.query(sql, _filter_params(port, session_id) + (lines,))
     
     def get_line_count(self, session_id: Optional[str] = None) -> int:
         """
@@ -350,17 +656,23 @@ class DatabaseManager:
             session_id: Optional session filter
         
         Returns:
-            Total number of lines captured
+            Total number of lines captured (without a session filter: the
+            running count, which includes this instance's own writes only)
         """
-        if session_id:
-            cursor = self.connection.execute(
-                "SELECT COUNT(*) FROM serial_data WHERE session_id = ?",
-                (session_id,)
-            )
-        else:
-            cursor = self.connection.execute("SELECT COUNT(*) FROM serial_data")
-        
-        return cursor.fetchone()[0]
+        if not session_id:
+            if not self.read_only:
+                return self._row_count
+            # Every line belongs to a session, so the per-session counts add up
+            # to the total (one row per session instead of a table scan)
+            return self.read_connection.execute(
+                "SELECT COALESCE(SUM(line_count), 0) FROM sessions"
+            ).fetchone()[0]
+        
+        row = self.read_connection.execute(
+            "SELECT line_count FROM sessions WHERE name = ?",
+            (session_id,)
+        ).fetchone()
+        return row[0] if row else 0
     
     def _cleanup_old_records(self):
         """
@@ -368,47 +680,75 @@ class DatabaseManager:
         Keeps only the most recent max_records
         """
         try:
-            # Get current record count
-            cursor = self.connection.execute("SELECT COUNT(*) FROM serial_data")
-            current_count = cursor.fetchone()[0]
-            
-            if current_count <= self.max_records:
-                return  # No cleanup needed
-            
-            # Calculate how many to delete
-            to_delete = current_count - self.max_records
-            
-            print(f"Database cleanup: {current_count:,} records, deleting oldest {to_delete:,}, keeping {self.max_records:,}")
-            
-            # Delete oldest records (keep most recent max_records)
-            # This is efficient because we have an index on id (PRIMARY KEY)
+            # Check and delete in one lock hold and one write transaction, so the
+            # count can't change in between
             with self.write_lock:
-                self.connection.execute(f"""
-                    DELETE FROM serial_data 
-                    WHERE id IN (
-                        SELECT id FROM serial_data 
-                        ORDER BY id ASC 
-                        LIMIT {to_delete}
-                    )
-                """)
-                self.connection.commit()
+                # Running count kept by the write path (no COUNT(*) scan per tick)
+                current_count = self._row_count
+                
+                if current_count <= self.max_records:
+                    return  # No cleanup needed
                 
-                # VACUUM to reclaim disk space (this can be slow, but necessary)
-                print("Running VACUUM to reclaim disk space...")
-                self.connection.execute("VACUUM")
+                # Calculate how many to delete
+                to_delete = current_count - self.max_records
                 
+                print(f"Database cleanup: {current_count:,} records, deleting oldest {to_delete:,}, keeping {self.max_records:,}")
+                
+                # Delete oldest records (keep most recent max_records)
+                # ids are the rowid and only grow, so this is a single range delete
+                # (MAX(id) is a lookup at the end of the b-tree, no sort or IN-list)
+                self.connection.execute("BEGIN IMMEDIATE")
+                try:
+                    (cutoff,) = self.connection.execute(
+                        "SELECT MAX(id) - ? FROM serial_lines", (self.max_records,)
+                    ).fetchone()
+                    # Take the rows off the per-session counts (reads only the deleted range)
+                    deleted_per_session = self.connection.execute(
+                        "SELECT -COUNT(*), session_id FROM serial_lines"
+                        " WHERE id <= ? GROUP BY session_id",
+                        (cutoff,)
+                    ).fetchall()
+                    self.connection.executemany(_COUNT_SESSION_SQL, deleted_per_session)
+                    cursor = self.connection.execute(
+                        "DELETE FROM serial_lines WHERE id <= ?", (cutoff,)
+                    )
+                    self.connection.execute("COMMIT")
+                except sqlite3.Error:
+                    self.connection.rollback()
+                    raise
+                self._row_count -= cursor.rowcount  # Exact even if ids have gaps
+            
+            # Return a bounded number of free pages to the OS (a full VACUUM would
+            # rewrite the whole file and stall writers); separate lock hold so
+            # buffered inserts can get in between
+            # (executescript steps the pragma to completion, execute() frees one page)
+            with self.write_lock:
+                self.connection.executescript("PRAGMA incremental_vacuum(500);")
+                # Refresh planner statistics if the delete made them stale
+                # (a no-op otherwise)
+                self.connection.execute("PRAGMA optimize")
+            
             print(f"Cleanup complete. Database now has {self.max_records:,} records.")
             
         except Exception as e:
             print(f"Error during database cleanup: {e}")
     
     def _cleanup_task(self):
-        """Background task that periodically cleans up old records"""
+        """
+        Background task that periodically cleans up old records
+        
+        cleanup_interval is the longest wait; under load the wait shrinks so a
+        run comes roughly every 10% of max_records new rows (but at most every
+        5 seconds).
+        """
         print(f"Database cleanup task started (interval: {self.cleanup_interval}s, max records: {self.max_records:,})")
         
+        wait = self.cleanup_interval
+        last_inserted = self._rows_inserted
+        last_time = time.monotonic()
         while not self.cleanup_stop_event.is_set():
             # Wait for cleanup interval or stop event
-            if self.cleanup_stop_event.wait(timeout=self.cleanup_interval):
+            if self.cleanup_stop_event.wait(timeout=wait):
                 break  # Stop event was set
             
             # Perform cleanup
@@ -416,9 +756,31 @@ class DatabaseManager:
                 self._cleanup_old_records()
             except Exception as e:
                 print(f"Cleanup task error: {e}")
+            
+            # Insert rate since the last run sets the next wait
+            now = time.monotonic()
+            inserted = self._rows_inserted
+            rate = (inserted - last_inserted) / max(now - last_time, 0.001)
+            last_inserted, last_time = inserted, now
+            
+            wait = self.cleanup_interval
+            if rate > 0:
+                wait = max(min(5, wait), min(wait, self.max_records * 0.1 / rate))
         
         print("Database cleanup task stopped")
     
+    def _start_writer_task(self):
+        """Start background writer task"""
+        if self.writer_thread is None or not self.writer_thread.is_alive():
+            self.writer_thread = Thread(target=self._writer_task, daemon=True)
+            self.writer_thread.start()
+    
+    def _stop_writer_task(self):
+        """Stop background writer task after it has written everything queued"""
+        if self.writer_thread and self.writer_thread.is_alive():
+            self.write_queue.put(_STOP)
+            self.writer_thread.join(timeout=5)
+    
     def _start_cleanup_task(self):
         """Start background cleanup task"""
         if self.cleanup_thread is None or not self.cleanup_thread.is_alive():
@@ -440,11 +802,20 @@ class DatabaseManager:
         
         if self.connection:
             try:
-                # Flush any pending writes
-                self.flush()
+                # Write any queued rows
+                self._stop_writer_task()
+                
+                # Let SQLite update statistics the planner relied on this session
+                with self.write_lock:
+                    self.connection.execute("PRAGMA optimize")
                 
-                # Close connection
+                # Close connections
+                if self.read_connection:
+                    self.read_connection.close()
                 self.connection.close()
                 print("Database connection closed")
             except Exception as e:
                 print(f"Error closing database: {e}")
+        elif self.read_connection:
+            self.read_connection.close()
+            self.read_connection = None
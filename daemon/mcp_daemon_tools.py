@@ -3,43 +3,66 @@ MCP Tools for Serial Daemon Control
 Provides AI-agent-friendly tools for daemon management and data queries
 """
 import os
+import re
 import sys
 import json
+import weakref
+import threading
 import time
+import select
+import signal
 import subprocess
+from functools import cached_property
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 from datetime import datetime
 
 # === SETUP VENDORED PACKAGES FIRST ===
 def setup_vendored_packages():
     """Add vendored packages to Python path for self-contained execution"""
-    daemon_dir = Path(__file__).parent
-    vendor_dir = daemon_dir / "vendor"
-    
-    if vendor_dir.exists():
-        vendor_packages = [
-            vendor_dir / "pyserial",  # pyserial package
-            vendor_dir / "psutil",    # psutil package
-            vendor_dir / "mcp",       # mcp package
-        ]
-        
-        for package_path in vendor_packages:
-            if package_path.exists():
-                path_str = str(package_path)
-                if path_str not in sys.path:
-                    sys.path.insert(0, path_str)
+    vendor_dir = Path(__file__).parent / "vendor"
+    
+    # One directory read instead of a stat() per package
+    try:
+        entries = {e.name: e.path for e in os.scandir(vendor_dir)}
+    except FileNotFoundError:
+        return
+    
+    vendor_packages = [
+        entries[name] for name in ("pyserial", "mcp")  # pyserial, mcp packages
+        if name in entries
+    ]
+    # Several modules call this on import, only the first one adds anything
+    sys.path[:0] = [path for path in vendor_packages if path not in sys.path]
 
 # Setup vendored packages before any other imports
 setup_vendored_packages()
 
-# Add daemon directory to path for imports
+# Add daemon directory to path for imports (once, re-imports don't grow sys.path)
 DAEMON_DIR = Path(__file__).parent
-sys.path.insert(0, str(DAEMON_DIR))
+if str(DAEMON_DIR) not in sys.path:
+    sys.path.insert(0, str(DAEMON_DIR))
 
+import proc
 from daemon_manager import DaemonManager
 from db_manager import DatabaseManager
-from daemon_commands import DaemonCommands
+from daemon_commands import get_daemon
+
+# pyserial (vendored) for port discovery; without it there's simply nothing to list
+try:
+    from serial.tools import list_ports
+except ImportError:
+    list_ports = None
+
+# orjson is optional: a C encoder for large query results; otherwise stdlib JSON
+try:
+    import orjson
+
+    def _dumps_pretty(obj: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode('utf-8')
+except ImportError:
+    def _dumps_pretty(obj: Any) -> str:
+        return json.dumps(obj, indent=2)
 
 # === DEBUG LOGGING ===
 DEBUG = os.environ.get('SERIAL_DAEMON_DEBUG', '').lower() in ('1', 'true', 'yes')
@@ -51,6 +74,30 @@ def debug_log(component: str, message: str, level: str = "INFO"):
         print(f"[{timestamp}] [{level}] [{component}] {message}", flush=True)
 
 
+# Port enumeration walks SetupAPI/sysfs, so the list is reused for a couple of seconds
+_COMPORTS_TTL = 2.0
+_comports_cache = (0.0, None)  # (monotonic time, list of ListPortInfo)
+
+
+def _comports() -> list:
+    """serial.tools.list_ports.comports(), cached for _COMPORTS_TTL seconds"""
+    global _comports_cache
+    stamp, ports = _comports_cache
+    if ports is not None and time.monotonic() - stamp < _COMPORTS_TTL:
+        return ports
+    if list_ports is None:
+        raise ImportError("pyserial is not available")
+    ports = list_ports.comports()
+    _comports_cache = (time.monotonic(), ports)
+    return ports
+
+
+def refresh_ports():
+    """Forget the cached port list (the next lookup enumerates again)"""
+    global _comports_cache
+    _comports_cache = (0.0, None)
+
+
 def find_serial_ports() -> List[Dict[str, Any]]:
     """
     Find all available serial ports with device information
@@ -59,9 +106,8 @@ def find_serial_ports() -> List[Dict[str, Any]]:
         List of port dictionaries with device, description, manufacturer, vid, pid
     """
     try:
-        import serial.tools.list_ports
         ports = []
-        for port in serial.tools.list_ports.comports():
+        for port in _comports():
             ports.append({
                 'device': port.device,
                 'description': port.description,
@@ -76,6 +122,22 @@ def find_serial_ports() -> List[Dict[str, Any]]:
         return []
 
 
+# Raspberry Pi Pico: VID=2E8A (Raspberry Pi), PID=0005 (Pico), or named like one
+_PICO_USB_ID = (0x2E8A, 0x0005)
+_PICO_DESCRIPTION = re.compile(r'Pico|RP2')
+
+
+def _is_pico(port) -> bool:
+    """True if a comports() entry looks like a Raspberry Pi Pico"""
+    if (port.vid, port.pid) == _PICO_USB_ID:
+        return True
+    manufacturer = port.manufacturer
+    if manufacturer and 'Raspberry Pi' in manufacturer:
+        return True
+    description = port.description
+    return bool(description and _PICO_DESCRIPTION.search(description))
+
+
 def find_pico_ports() -> List[str]:
     """
     Find all Raspberry Pi Pico devices
@@ -84,36 +146,321 @@ def find_pico_ports() -> List[str]:
         List of port device names (e.g., ['COM9', 'COM10'])
     """
     try:
-        import serial.tools.list_ports
-        pico_ports = []
-        for port in serial.tools.list_ports.comports():
-            # Raspberry Pi Pico: VID=2E8A (Raspberry Pi), PID=0005 (Pico)
-            is_pico = False
-            
-            if port.vid == 0x2E8A and port.pid == 0x0005:
-                is_pico = True
-            elif port.manufacturer and 'Raspberry Pi' in port.manufacturer:
-                is_pico = True
-            elif port.description and ('Pico' in port.description or 'RP2' in port.description):
-                is_pico = True
-                
-            if is_pico:
-                pico_ports.append(port.device)
-                
-        return pico_ports
+        return [port.device for port in _comports() if _is_pico(port)]
     except Exception as e:
         print(f"Error finding Pico ports: {e}", file=sys.stderr)
         return []
 
 
+def _wait_ready(fd: int, timeout: float) -> bool:
+    """
+    Wait for the daemon's ready byte on the startup pipe
+    
+    Returns:
+        True if the daemon signalled ready, False on timeout or if it exited first
+    """
+    if not select.select([fd], [], [], timeout)[0]:
+        return False
+    return os.read(fd, 1) == b"1"
+
+
+def _spawn_win32(cmd_args: List[str], log_file: Path):
+    """
+    Windows: start the daemon detached (CREATE_NEW_PROCESS_GROUP + DETACHED_PROCESS)
+    
+    Returns:
+        (pid, wait_ready function, or None if the ready event couldn't be set up)
+    """
+    debug_log("MCP_TOOLS", "Platform: Windows (using CREATE_NEW_PROCESS_GROUP + DETACHED_PROCESS)")
+    
+    # The daemon sets this named event once it's up (see signal_ready in
+    # serial_daemon.py); the wait also ends if the process exits first
+    name = f"Local\\serial-monitor-ready-{os.urandom(8).hex()}"
+    event = proc.create_event(name)
+    env = {**os.environ, 'DAEMON_READY_EVENT': name} if event else None
+    
+    # Open log file for daemon output (append-only, unbuffered: the fd is all the child gets)
+    with open(log_file, 'ab', buffering=0) as log:
+        process = subprocess.Popen(
+            cmd_args,
+            creationflags=(
+                subprocess.CREATE_NEW_PROCESS_GROUP | 
+                subprocess.CREATE_NO_WINDOW |
+                0x00000008  # DETACHED_PROCESS - completely detach from parent console
+            ),
+            stdout=log,
+            stderr=log,
+            stdin=subprocess.DEVNULL,
+            env=env
+        )
+    # Opened while Popen still holds its own handle, so the process can't be gone yet
+    handle = proc.open_process(process.pid, proc.SYNCHRONIZE) if event else None
+    if not handle:
+        if event:
+            proc.close_handle(event)
+        return process.pid, None
+    
+    def wait_ready(timeout: float) -> bool:
+        try:
+            return proc.wait_event(event, handle, timeout)
+        finally:
+            proc.close_handle(event)
+            proc.close_handle(handle)
+    
+    return process.pid, wait_ready
+
+
+def _spawn_posix(cmd_args: List[str], log_file: Path):
+    """
+    Unix: posix_spawn the daemon into a new session
+    
+    No fork of this process's address space, which matters once the MCP
+    server has grown.
+    
+    Returns:
+        (pid, wait_ready function)
+    """
+    debug_log("MCP_TOOLS", "Platform: Unix (using posix_spawn + setsid)")
+    
+    # The daemon writes one byte to this pipe once it's up (see
+    # signal_ready in serial_daemon.py); EOF means it exited first
+    ready_fd, ready_w = os.pipe()
+    try:
+        os.set_inheritable(ready_w, True)
+        with open(log_file, 'ab', buffering=0) as log:
+            pid = os.posix_spawn(
+                sys.executable,
+                cmd_args,
+                {**os.environ, 'DAEMON_READY_FD': str(ready_w)},
+                file_actions=[
+                    (os.POSIX_SPAWN_OPEN, 0, os.devnull, os.O_RDONLY, 0),
+                    (os.POSIX_SPAWN_DUP2, log.fileno(), 1),
+                    (os.POSIX_SPAWN_DUP2, log.fileno(), 2),
+                ],
+                setsid=True
+            )
+    except BaseException:
+        os.close(ready_fd)
+        raise
+    finally:
+        os.close(ready_w)
+    
+    def wait_ready(timeout: float) -> bool:
+        try:
+            return _wait_ready(ready_fd, timeout)
+        finally:
+            os.close(ready_fd)
+            proc.reap(pid)  # Collects it now if it exited during startup
+    
+    return pid, wait_ready
+
+
+# Chosen once at import, start_daemon doesn't branch on the platform
+_spawn_daemon = _spawn_win32 if sys.platform == 'win32' else _spawn_posix
+
+# Status/tail results are shared with callers arriving within this many seconds
+_COALESCE_WINDOW = 0.05
+
+# A daemon health check is reused for this many seconds by tools that need the daemon
+_HEALTH_TTL = 0.1
+
+
 class DaemonMCPTools:
     """MCP tools for daemon control and data access"""
     
     def __init__(self):
-        """Initialize MCP tools"""
-        self.daemon_mgr = DaemonManager()
-        self.daemon_script = DAEMON_DIR / "serial_daemon.py"
-        self.commands = DaemonCommands()  # Command interface
+        """
+        Initialize MCP tools
+        
+        The daemon manager, command interface and daemon command line are
+        created on first use (see the properties below), so instances made
+        only to list the tools stay cheap.
+        """
+        # Read-only database handles, one per thread, opened on first query
+        # and kept (see _db); _db_mgrs tracks them all for close()
+        self._db_local = threading.local()
+        self._db_mgrs: List[DatabaseManager] = []
+        self._db_lock = threading.Lock()
+        
+        # Request dedup for status/tail bursts (see _coalesce)
+        self._results_lock = threading.Lock()
+        self._inflight: Dict[tuple, threading.Event] = {}
+        self._recent_results: Dict[tuple, tuple] = {}  # key -> (monotonic time, result)
+        self._results_gen = 0
+        self._health_cache = (0.0, False)  # (monotonic time, healthy), see _healthy
+        
+        # Close the database handles at exit, or when the instance is collected
+        # (holds only the handle list, not the instance)
+        weakref.finalize(self, self._close_dbs, self._db_mgrs, self._db_lock)
+    
+    @cached_property
+    def daemon_mgr(self) -> DaemonManager:
+        """PID/lock/log file manager (creates the state directory)"""
+        return DaemonManager()
+    
+    @cached_property
+    def daemon_script(self) -> Path:
+        """Path of the daemon entry script"""
+        return DAEMON_DIR / "serial_daemon.py"
+    
+    @cached_property
+    def _base_cmd(self) -> tuple:
+        """Interpreter and script, the fixed start of the daemon command line"""
+        return (sys.executable, str(self.daemon_script))
+    
+    @cached_property
+    def commands(self):
+        """Command interface (shared, per-thread connections)"""
+        return get_daemon()
+    
+    def __enter__(self) -> 'DaemonMCPTools':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """Close the cached database handles and this thread's daemon connection"""
+        if 'commands' in self.__dict__:
+            self.commands.close()
+        self._close_dbs(self._db_mgrs, self._db_lock)
+    
+    @staticmethod
+    def _close_dbs(db_mgrs: List[DatabaseManager], db_lock: threading.Lock):
+        """Close and forget the tracked database handles"""
+        with db_lock:
+            for db_mgr in db_mgrs:
+                db_mgr.close()
+            db_mgrs.clear()
+    
+    def _db(self) -> DatabaseManager:
+        """
+        This thread's read-only database handle
+        
+        Kept open across tool calls, so queries reuse the connection and its
+        statement cache instead of opening the database each time. Threads
+        don't share handles, so concurrent tool calls don't wait on each other.
+        Reopened if the database file was replaced (daemon corruption recovery).
+        """
+        db_file = self.daemon_mgr.db_file
+        try:
+            inode = os.stat(db_file).st_ino
+        except FileNotFoundError:
+            inode = None
+        
+        local = self._db_local
+        db_mgr = getattr(local, 'mgr', None)
+        if db_mgr is not None:
+            if db_mgr.read_connection is not None and local.inode == inode:
+                return db_mgr
+            self._drop_db(db_mgr)  # Closed by close(), or the file was replaced
+        
+        if inode is None:
+            # Nothing captured yet: create the schema so queries come back
+            # empty instead of failing
+            with self._db_lock:
+                if not db_file.exists():
+                    self._create_db(db_file)
+            inode = os.stat(db_file).st_ino
+        
+        db_mgr = DatabaseManager(db_file, read_only=True)
+        with self._db_lock:
+            self._db_mgrs.append(db_mgr)
+        local.mgr, local.inode = db_mgr, inode
+        return db_mgr
+    
+    @staticmethod
+    def _create_db(db_file: Path):
+        """
+        Create an empty database without exposing it half-initialised
+        
+        The schema is written to a private file and hard-linked into place, so
+        other threads and processes only ever see db_file with its schema
+        committed (and a database created meanwhile is left alone).
+        """
+        tmp = db_file.with_name(f"{db_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            DatabaseManager(tmp).close()
+            try:
+                os.link(tmp, db_file)
+            except FileExistsError:
+                pass  # The daemon (or another process) got there first
+        finally:
+            for path in (tmp, tmp.with_name(tmp.name + '-wal'), tmp.with_name(tmp.name + '-shm')):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+    
+    def _drop_db(self, db_mgr: DatabaseManager):
+        """Close one cached database handle and stop tracking it"""
+        with self._db_lock:
+            if db_mgr in self._db_mgrs:
+                self._db_mgrs.remove(db_mgr)
+        db_mgr.close()
+    
+    def refresh_ports(self):
+        """Re-enumerate serial ports on the next lookup instead of using the cached list"""
+        refresh_ports()
+    
+    def _coalesce(self, key: tuple, compute) -> Dict[str, Any]:
+        """
+        Run compute() once for concurrent callers with the same key
+        
+        Callers arriving while a computation is in flight wait for it, and a
+        result stays shared for _COALESCE_WINDOW seconds. Each caller gets its
+        own shallow copy of the result dictionary.
+        """
+        with self._results_lock:
+            cached = self._recent_results.get(key)
+            if cached is not None and time.monotonic() - cached[0] < _COALESCE_WINDOW:
+                return dict(cached[1])
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+                gen = self._results_gen
+        
+        if not leader:
+            event.wait()
+            with self._results_lock:
+                cached = self._recent_results.get(key)
+            if cached is not None:
+                return dict(cached[1])
+            return compute()  # Leader failed or its result was invalidated
+        
+        try:
+            result = compute()
+            with self._results_lock:
+                if gen == self._results_gen:
+                    now = time.monotonic()
+                    # Drop stale entries so varying tail arguments don't pile up
+                    for stale in [k for k, (t, _) in self._recent_results.items()
+                                  if now - t >= _COALESCE_WINDOW]:
+                        del self._recent_results[stale]
+                    self._recent_results[key] = (now, result)
+        finally:
+            with self._results_lock:
+                del self._inflight[key]
+            event.set()
+        return dict(result)
+    
+    def _forget_results(self):
+        """Invalidate shared status/tail results and the health check (daemon or port state is changing)"""
+        self._health_cache = (0.0, False)
+        with self._results_lock:
+            self._results_gen += 1
+            self._recent_results.clear()
+    
+    def _healthy(self) -> bool:
+        """check_daemon_health(), reused for _HEALTH_TTL seconds across chained tool calls"""
+        stamp, healthy = self._health_cache
+        now = time.monotonic()
+        if now - stamp < _HEALTH_TTL:
+            return healthy
+        healthy = self.daemon_mgr.check_daemon_health()
+        self._health_cache = (now, healthy)
+        return healthy
     
     def start_daemon(self, auto_connect: bool = False, port: str = "COM9", baudrate: int = 115200, 
                     max_records: int = 10000, cleanup_interval: int = 60) -> Dict[str, Any]:
@@ -154,7 +501,7 @@ class DaemonMCPTools:
         try:
             # Build command args
             debug_log("MCP_TOOLS", f"Building daemon command: Python={sys.executable}")
-            cmd_args = [sys.executable, str(self.daemon_script)]
+            cmd_args = list(self._base_cmd)
             
             # Add database settings
             cmd_args.extend(['--max-records', str(max_records)])
@@ -175,52 +522,30 @@ class DaemonMCPTools:
             log_file = self.daemon_mgr.log_file
             debug_log("MCP_TOOLS", f"Daemon output will be logged to: {log_file}")
             
-            if sys.platform == 'win32':
-                # Windows: use CREATE_NEW_PROCESS_GROUP to detach + DETACHED_PROCESS
-                debug_log("MCP_TOOLS", "Platform: Windows (using CREATE_NEW_PROCESS_GROUP + DETACHED_PROCESS)")
-                
-                # Open log file for daemon output
-                with open(log_file, 'a') as log:
-                    process = subprocess.Popen(
-                        cmd_args,
-                        creationflags=(
-                            subprocess.CREATE_NEW_PROCESS_GROUP | 
-                            subprocess.CREATE_NO_WINDOW |
-                            0x00000008  # DETACHED_PROCESS - completely detach from parent console
-                        ),
-                        stdout=log,
-                        stderr=log,
-                        stdin=subprocess.DEVNULL
-                    )
-            else:
-                # Unix: use nohup-style detachment with proper process group
-                debug_log("MCP_TOOLS", "Platform: Unix (using start_new_session + nohup)")
-                
-                with open(log_file, 'a') as log:
-                    process = subprocess.Popen(
-                        cmd_args,
-                        stdout=log,
-                        stderr=log,
-                        stdin=subprocess.DEVNULL,
-                        start_new_session=True,
-                        preexec_fn=os.setpgrp if hasattr(os, 'setpgrp') else None
-                    )
+            pid, wait_ready = _spawn_daemon(cmd_args, log_file)
             
-            debug_log("MCP_TOOLS", f"Daemon process spawned with PID: {process.pid}")
+            debug_log("MCP_TOOLS", f"Daemon process spawned with PID: {pid}")
             
-            # Wait for daemon to start (check for PID file)
+            # Wait for daemon to start (ready pipe/event, or woken by the PID file appearing)
             debug_log("MCP_TOOLS", "Waiting for daemon to initialize (max 5s)...")
-            for i in range(50):  # 5 seconds max
-                time.sleep(0.1)
-                if self.daemon_mgr.check_daemon_health():
-                    info = self.daemon_mgr.get_daemon_info()
-                    debug_log("MCP_TOOLS", f"[SUCCESS] Daemon started successfully after {(i+1)*0.1:.1f}s", "SUCCESS")
-                    return {
-                        'success': True,
-                        'message': 'Daemon started successfully',
-                        'already_running': False,
-                        'info': info
-                    }
+            wait_start = time.monotonic()
+            if wait_ready is not None:
+                # Exited/timeout: a daemon that lost the startup race to another
+                # one still leaves a healthy daemon behind
+                ready = wait_ready(5.0) or self.daemon_mgr.check_daemon_health()
+            else:
+                ready = self.daemon_mgr.wait_for_daemon(timeout=5.0)
+            
+            if ready:
+                self._forget_results()
+                info = self.daemon_mgr.get_daemon_info()
+                debug_log("MCP_TOOLS", f"[SUCCESS] Daemon started successfully after {time.monotonic() - wait_start:.3f}s", "SUCCESS")
+                return {
+                    'success': True,
+                    'message': 'Daemon started successfully',
+                    'already_running': False,
+                    'info': info
+                }
             
             # Timeout waiting for daemon to start
             return {
@@ -255,47 +580,50 @@ class DaemonMCPTools:
         
         pid, timestamp, port, session_id = pid_data
         
-        # Check if process exists
-        if not self.daemon_mgr.is_process_running(pid):
-            # Stale PID file
-            self.daemon_mgr.cleanup_stale_files()
-            return {
-                'success': True,
-                'message': 'Daemon not running (stale PID cleaned up)',
-                'was_running': False
-            }
-        
-        # Send SIGTERM
+        # Pin the process before checking it (pidfd on Linux, one handle on
+        # Windows), so the signals and waits below can't reach another process
+        # that reuses the PID
+        ref = proc.open_ref(pid)
         try:
-            if sys.platform == 'win32':
-                # Windows: use taskkill
-                subprocess.run(['taskkill', '/PID', str(pid), '/F'], 
-                             capture_output=True, timeout=5)
+            # Check if process exists (through the reference when we have one)
+            if ref is not None:
+                running = proc.ref_running(ref)
             else:
-                # Unix: use kill
-                import signal
-                os.kill(pid, signal.SIGTERM)
+                running = self.daemon_mgr.is_process_running(pid)
+            if not running:
+                # Stale PID file
+                self.daemon_mgr.cleanup_stale_files()
+                return {
+                    'success': True,
+                    'message': 'Daemon not running (stale PID cleaned up)',
+                    'was_running': False
+                }
             
-            # Wait for process to exit
-            for _ in range(50):  # 5 seconds max
-                time.sleep(0.1)
-                if not self.daemon_mgr.is_process_running(pid):
-                    # Process exited
-                    self.daemon_mgr.cleanup_stale_files()
-                    return {
-                        'success': True,
-                        'message': 'Daemon stopped successfully',
-                        'was_running': True
-                    }
+            # Ask the daemon to shut down cleanly (flushes the database, removes its files)
+            response = self.commands.send_command('shutdown')
+            if not response.get('success'):
+                # Not answering commands: SIGTERM on Unix (same clean shutdown),
+                # nothing gentler than TerminateProcess on Windows
+                if sys.platform == 'win32':
+                    proc.terminate(pid, ref)
+                else:
+                    proc.send_signal(pid, signal.SIGTERM, ref)
+            
+            # Wait for process to exit (woken by the OS when it does, 5 seconds max)
+            if proc.wait_exit(pid, timeout=5.0, ref=ref):
+                proc.reap(pid)
+                self.daemon_mgr.cleanup_stale_files()
+                return {
+                    'success': True,
+                    'message': 'Daemon stopped successfully',
+                    'was_running': True
+                }
             
             # Process didn't exit, force kill
-            if sys.platform == 'win32':
-                subprocess.run(['taskkill', '/PID', str(pid), '/F'], 
-                             capture_output=True, timeout=5)
-            else:
-                os.kill(pid, signal.SIGKILL)
+            proc.terminate(pid, ref)
             
-            time.sleep(0.5)
+            proc.wait_exit(pid, timeout=0.5, ref=ref)
+            proc.reap(pid)
             self.daemon_mgr.cleanup_stale_files()
             
             return {
@@ -311,6 +639,9 @@ class DaemonMCPTools:
                 'message': f'Failed to stop daemon: {e}',
                 'error': str(e)
             }
+        finally:
+            proc.close_ref(ref)
+            self._forget_results()
     
     def get_status(self) -> Dict[str, Any]:
         """
@@ -319,6 +650,10 @@ class DaemonMCPTools:
         Returns:
             Status dictionary with daemon info
         """
+        return self._coalesce(('status',), self._read_status)
+    
+    def _read_status(self) -> Dict[str, Any]:
+        """Build the status dictionary (get_status without request dedup)"""
         info = self.daemon_mgr.get_daemon_info()
         
         if info is None:
@@ -327,11 +662,24 @@ class DaemonMCPTools:
                 'message': 'Daemon not running'
             }
         
-        # Get line count from database
+        # Line counts and uptime from the daemon (one round-trip, no database
+        # access here). lines_captured is the lines stored for the session,
+        # lines_received the lines read from the port since the daemon started
+        response = self.commands.send_command('status')
+        if response.get('success'):
+            status = response['status']
+            for key in ('uptime', 'lines_received'):
+                if key in status:
+                    info[key] = status[key]
+            line_count = status.get('lines_captured')
+            if line_count is not None:
+                info['lines_captured'] = line_count
+                return info
+        
+        # Daemon not answering, or too old to report its line count: count the
+        # session's rows in the database instead
         try:
-            db_mgr = DatabaseManager(self.daemon_mgr.db_file)
-            line_count = db_mgr.get_line_count(info['session_id'])
-            db_mgr.close()
+            line_count = self._db().get_line_count(info['session_id'])
             info['lines_captured'] = line_count
         except Exception as e:
             info['lines_captured'] = None
@@ -355,7 +703,7 @@ class DaemonMCPTools:
         
         # Check if daemon is running
         debug_log("MCP_TOOLS", "Checking daemon health...")
-        if not self.daemon_mgr.check_daemon_health():
+        if not self._healthy():
             debug_log("MCP_TOOLS", "Daemon not running!", "ERROR")
             return {
                 'success': False,
@@ -364,7 +712,22 @@ class DaemonMCPTools:
             }
         debug_log("MCP_TOOLS", "Daemon is running")
         
-        # Auto-detect port if not specified
+        port, error = self._resolve_port(port)
+        if error is not None:
+            return error
+        
+        # Send connect command
+        response = self.commands.send_command('connect', port=port, baudrate=baudrate)
+        self._forget_results()
+        return response
+    
+    def _resolve_port(self, port: Optional[str]):
+        """
+        Auto-detect a Raspberry Pi Pico if no port was given
+        
+        Returns:
+            (port, None) or (None, error response)
+        """
         if port is None:
             debug_log("MCP_TOOLS", "Port not specified, auto-detecting Raspberry Pi Pico...")
             pico_ports = find_pico_ports()
@@ -372,7 +735,7 @@ class DaemonMCPTools:
             
             if len(pico_ports) == 0:
                 debug_log("MCP_TOOLS", "No Pico devices found", "ERROR")
-                return {
+                return None, {
                     'success': False,
                     'message': 'No Raspberry Pi Pico detected. Please specify port manually.',
                     'error': 'NO_PICO_FOUND',
@@ -382,15 +745,47 @@ class DaemonMCPTools:
                 port = pico_ports[0]
                 print(f"Auto-detected Raspberry Pi Pico on {port}")
             else:
-                return {
+                return None, {
                     'success': False,
                     'message': f'Multiple Raspberry Pi Picos detected: {pico_ports}. Please specify port.',
                     'error': 'MULTIPLE_PICOS',
                     'pico_ports': pico_ports
                 }
+        return port, None
+    
+    def connect_and_send(self, data: str, port: Optional[str] = None,
+                         baudrate: int = 115200) -> Dict[str, Any]:
+        """
+        Connect to a serial port and send data in one daemon round-trip
         
-        # Send connect command
-        return self.commands.send_command('connect', port=port, baudrate=baudrate)
+        Args:
+            data: String data to send once connected
+            port: Serial port (None = auto-detect Pico)
+            baudrate: Baud rate
+        
+        Returns:
+            Write result, with the individual 'connect' and 'write' responses
+        """
+        if not self._healthy():
+            return {
+                'success': False,
+                'message': 'Daemon not running. Start daemon first.',
+                'error': 'DAEMON_NOT_RUNNING'
+            }
+        
+        port, error = self._resolve_port(port)
+        if error is not None:
+            return error
+        
+        connected, written = self.commands.send_batch([
+            ('connect', {'port': port, 'baudrate': baudrate}),
+            ('write', {'data': data}),
+        ])
+        self._forget_results()
+        
+        if not connected.get('success'):
+            return connected
+        return {**written, 'connect': connected, 'write': written}
     
     def disconnect_port(self) -> Dict[str, Any]:
         """
@@ -401,7 +796,7 @@ class DaemonMCPTools:
             Status dictionary
         """
         # Check if daemon is running
-        if not self.daemon_mgr.check_daemon_health():
+        if not self._healthy():
             return {
                 'success': False,
                 'message': 'Daemon not running',
@@ -409,19 +804,22 @@ class DaemonMCPTools:
             }
         
         # Send disconnect command
-        return self.commands.send_command('disconnect')
+        response = self.commands.send_command('disconnect')
+        self._forget_results()
+        return response
     
-    def send_data(self, data: str) -> Dict[str, Any]:
+    def send_data(self, data: Union[str, bytes]) -> Dict[str, Any]:
         """
         Send data to connected serial device
         
         Args:
-            data: String data to send to device
+            data: String data to send to device (newline added), or raw bytes
+                sent as-is outside the JSON frame
         
         Returns:
             Success status and message
         """
-        if not self.daemon_mgr.check_daemon_health():
+        if not self._healthy():
             return {
                 'success': False,
                 'message': 'Daemon not running',
@@ -429,6 +827,8 @@ class DaemonMCPTools:
             }
         
         # Send write command
+        if isinstance(data, (bytes, bytearray)):
+            return self.commands.send_command('write', payload=data)
         return self.commands.send_command('write', data=data)
     
     def set_echo(self, enabled: bool) -> Dict[str, Any]:
@@ -441,7 +841,7 @@ class DaemonMCPTools:
         Returns:
             Success status and message
         """
-        if not self.daemon_mgr.check_daemon_health():
+        if not self._healthy():
             return {
                 'success': False,
                 'message': 'Daemon not running',
@@ -466,9 +866,7 @@ class DaemonMCPTools:
             params = []
         
         try:
-            db_mgr = DatabaseManager(self.daemon_mgr.db_file)
-            results = db_mgr.query(sql, tuple(params))
-            db_mgr.close()
+            results = self._db().query(sql, tuple(params))
             
             return {
                 'success': True,
@@ -498,9 +896,7 @@ class DaemonMCPTools:
             Recent data or error
         """
         try:
-            db_mgr = DatabaseManager(self.daemon_mgr.db_file)
-            results = db_mgr.get_recent(seconds, port, session_id, limit)
-            db_mgr.close()
+            results = self._db().get_recent(seconds, port, session_id, limit)
             
             return {
                 'success': True,
@@ -529,10 +925,14 @@ class DaemonMCPTools:
         Returns:
             Last N lines or error
         """
+        return self._coalesce(('tail', lines, port, session_id),
+                              lambda: self._read_tail(lines, port, session_id))
+    
+    def _read_tail(self, lines: int, port: Optional[str],
+                   session_id: Optional[str]) -> Dict[str, Any]:
+        """Run the tail query (get_tail without request dedup)"""
         try:
-            db_mgr = DatabaseManager(self.daemon_mgr.db_file)
-            results = db_mgr.get_tail(lines, port, session_id)
-            db_mgr.close()
+            results = self._db().get_tail(lines, port, session_id)
             
             return {
                 'success': True,
@@ -549,162 +949,165 @@ class DaemonMCPTools:
             }
 
 
-# MCP Tool Definitions (for registration)
-def get_mcp_tools():
-    """
-    Get MCP tool definitions
-    
-    Returns:
-        List of tool definitions
-    """
-    return [
-        {
-            'name': 'serial_daemon_start',
-            'description': 'Start serial monitor daemon (idempotent - safe to call if already running)',
-            'parameters': {
-                'type': 'object',
-                'properties': {
-                    'port': {
-                        'type': 'string',
-                        'description': 'Serial port to monitor (e.g., COM9)',
-                        'default': 'COM9'
-                    },
-                    'baudrate': {
-                        'type': 'integer',
-                        'description': 'Baud rate for serial connection',
-                        'default': 115200
-                    }
+# MCP Tool Definitions (for registration; plain data, built once at import)
+_MCP_TOOLS = (
+    {
+        'name': 'serial_daemon_start',
+        'description': 'Start serial monitor daemon (idempotent - safe to call if already running)',
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'port': {
+                    'type': 'string',
+                    'description': 'Serial port to monitor (e.g., COM9)',
+                    'default': 'COM9'
+                },
+                'baudrate': {
+                    'type': 'integer',
+                    'description': 'Baud rate for serial connection',
+                    'default': 115200
                 }
             }
-        },
-        {
-            'name': 'serial_daemon_stop',
-            'description': 'Stop serial monitor daemon gracefully (idempotent)',
-            'parameters': {
-                'type': 'object',
-                'properties': {}
-            }
-        },
-        {
-            'name': 'serial_daemon_status',
-            'description': 'Get daemon status (running, uptime, lines captured, etc.)',
-            'parameters': {
-                'type': 'object',
-                'properties': {}
-            }
-        },
-        {
-            'name': 'serial_daemon_connect',
-            'description': 'Connect daemon to a serial port and start monitoring. Daemon must be running first.',
-            'parameters': {
-                'type': 'object',
-                'properties': {
-                    'port': {
-                        'type': 'string',
-                        'description': 'Serial port to monitor (e.g., COM9)',
-                        'default': 'COM9'
-                    },
-                    'baudrate': {
-                        'type': 'integer',
-                        'description': 'Baud rate for serial connection',
-                        'default': 115200
-                    }
+        }
+    },
+    {
+        'name': 'serial_daemon_stop',
+        'description': 'Stop serial monitor daemon gracefully (idempotent)',
+        'parameters': {
+            'type': 'object',
+            'properties': {}
+        }
+    },
+    {
+        'name': 'serial_daemon_status',
+        'description': 'Get daemon status (running, uptime, lines captured, etc.)',
+        'parameters': {
+            'type': 'object',
+            'properties': {}
+        }
+    },
+    {
+        'name': 'serial_daemon_connect',
+        'description': 'Connect daemon to a serial port and start monitoring. Daemon must be running first.',
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'port': {
+                    'type': 'string',
+                    'description': 'Serial port to monitor (e.g., COM9)',
+                    'default': 'COM9'
                 },
-                'required': ['port']
-            }
-        },
-        {
-            'name': 'serial_daemon_disconnect',
-            'description': 'Disconnect daemon from serial port and stop monitoring. Releases port for other tools. Daemon keeps running.',
-            'parameters': {
-                'type': 'object',
-                'properties': {}
-            }
-        },
-        {
-            'name': 'serial_send_data',
-            'description': 'Send data/command to connected serial device. Use when you need to send commands, control device, or transmit data to hardware.',
-            'parameters': {
-                'type': 'object',
-                'properties': {
-                    'data': {
-                        'type': 'string',
-                        'description': 'Data string to send to device (newline will be added automatically)'
-                    }
+                'baudrate': {
+                    'type': 'integer',
+                    'description': 'Baud rate for serial connection',
+                    'default': 115200
+                }
+            },
+            'required': ['port']
+        }
+    },
+    {
+        'name': 'serial_daemon_disconnect',
+        'description': 'Disconnect daemon from serial port and stop monitoring. Releases port for other tools. Daemon keeps running.',
+        'parameters': {
+            'type': 'object',
+            'properties': {}
+        }
+    },
+    {
+        'name': 'serial_send_data',
+        'description': 'Send data/command to connected serial device. Use when you need to send commands, control device, or transmit data to hardware.',
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'data': {
+                    'type': 'string',
+                    'description': 'Data string to send to device (newline will be added automatically)'
+                }
+            },
+            'required': ['data']
+        }
+    },
+    {
+        'name': 'serial_query',
+        'description': 'Execute SQL query on serial data (SELECT only)',
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'sql': {
+                    'type': 'string',
+                    'description': 'SQL SELECT query'
                 },
-                'required': ['data']
-            }
-        },
-        {
-            'name': 'serial_query',
-            'description': 'Execute SQL query on serial data (SELECT only)',
-            'parameters': {
-                'type': 'object',
-                'properties': {
-                    'sql': {
-                        'type': 'string',
-                        'description': 'SQL SELECT query'
-                    },
-                    'params': {
-                        'type': 'array',
-                        'description': 'Query parameters',
-                        'items': {},
-                        'default': []
-                    }
+                'params': {
+                    'type': 'array',
+                    'description': 'Query parameters',
+                    'items': {},
+                    'default': []
+                }
+            },
+            'required': ['sql']
+        }
+    },
+    {
+        'name': 'serial_get_recent',
+        'description': 'Get recent serial data from last N seconds',
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'seconds': {
+                    'type': 'integer',
+                    'description': 'Number of seconds to look back',
+                    'default': 60
                 },
-                'required': ['sql']
-            }
-        },
-        {
-            'name': 'serial_get_recent',
-            'description': 'Get recent serial data from last N seconds',
-            'parameters': {
-                'type': 'object',
-                'properties': {
-                    'seconds': {
-                        'type': 'integer',
-                        'description': 'Number of seconds to look back',
-                        'default': 60
-                    },
-                    'port': {
-                        'type': 'string',
-                        'description': 'Filter by port (optional)'
-                    },
-                    'session_id': {
-                        'type': 'string',
-                        'description': 'Filter by session (optional)'
-                    },
-                    'limit': {
-                        'type': 'integer',
-                        'description': 'Maximum rows to return',
-                        'default': 1000
-                    }
+                'port': {
+                    'type': 'string',
+                    'description': 'Filter by port (optional)'
+                },
+                'session_id': {
+                    'type': 'string',
+                    'description': 'Filter by session (optional)'
+                },
+                'limit': {
+                    'type': 'integer',
+                    'description': 'Maximum rows to return',
+                    'default': 1000
                 }
             }
-        },
-        {
-            'name': 'serial_get_tail',
-            'description': 'Get last N lines of serial data (like tail command)',
-            'parameters': {
-                'type': 'object',
-                'properties': {
-                    'lines': {
-                        'type': 'integer',
-                        'description': 'Number of lines to return',
-                        'default': 100
-                    },
-                    'port': {
-                        'type': 'string',
-                        'description': 'Filter by port (optional)'
-                    },
-                    'session_id': {
-                        'type': 'string',
-                        'description': 'Filter by session (optional)'
-                    }
+        }
+    },
+    {
+        'name': 'serial_get_tail',
+        'description': 'Get last N lines of serial data (like tail command)',
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'lines': {
+                    'type': 'integer',
+                    'description': 'Number of lines to return',
+                    'default': 100
+                },
+                'port': {
+                    'type': 'string',
+                    'description': 'Filter by port (optional)'
+                },
+                'session_id': {
+                    'type': 'string',
+                    'description': 'Filter by session (optional)'
                 }
             }
         }
-    ]
+    }
+)
+
+
+def get_mcp_tools():
+    """
+    Get MCP tool definitions
+    
+    Returns:
+        Tuple of tool definitions (shared; callers must not modify them)
+    """
+    return _MCP_TOOLS
 
 
 # CLI for testing
@@ -743,4 +1146,4 @@ if __name__ == "__main__":
     elif args.command == 'tail':
         result = tools.get_tail(args.lines)
     
-    print(json.dumps(result, indent=2))
+    print(_dumps_pretty(result))
@@ -8,12 +8,29 @@ import sys
 import os
 import json
 import asyncio
-from typing import Dict, Any, List, Optional
+import inspect
+import threading
+from typing import Dict, Any, Callable, List, Optional
 
 # Add daemon directory to path so we can import mcp_daemon_tools
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+_daemon_dir = os.path.dirname(os.path.abspath(__file__))
+if _daemon_dir not in sys.path:
+    sys.path.insert(0, _daemon_dir)
 
-from mcp_daemon_tools import DaemonMCPTools
+from mcp_daemon_tools import DaemonMCPTools, find_serial_ports, find_pico_ports
+
+# orjson is optional: faster and returns bytes directly; otherwise use compact stdlib JSON
+# (orjson.JSONDecodeError subclasses json.JSONDecodeError, so one except covers both)
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    _loads = json.loads
 
 
 class CopilotSerialToolMCPServer:
@@ -24,6 +41,44 @@ class CopilotSerialToolMCPServer:
         self.protocol_version = "2024-11-05"
         self.server_name = "copilot-serial-tool-daemon"
         self.server_version = "2.0.0"
+        self._pending_output: List[bytes] = []
+        
+        # initialize and tools/list answers never change, serialize their results once
+        self._initialize_result = _dumps({
+            "protocolVersion": self.protocol_version,
+            "capabilities": {
+                "tools": {}
+            },
+            "serverInfo": {
+                "name": self.server_name,
+                "version": self.server_version
+            }
+        })
+        self._tools_result = _dumps({"tools": self.get_tools()})
+        
+        # Tool name -> handler called with the arguments as keywords. Argument
+        # names and defaults match get_tools(), so missing arguments just fall
+        # back to the method defaults.
+        tools = self.daemon_tools
+        self._dispatch: Dict[str, Callable[..., Dict[str, Any]]] = {
+            "serial_daemon_start": tools.start_daemon,
+            "serial_daemon_stop": tools.stop_daemon,
+            "serial_daemon_status": tools.get_status,
+            "serial_daemon_connect": tools.connect_port,  # port=None auto-detects
+            "serial_daemon_disconnect": tools.disconnect_port,
+            "serial_send_data": tools.send_data,
+            "serial_connect_and_send": tools.connect_and_send,
+            "serial_set_echo": tools.set_echo,
+            "serial_query": tools.query_data,
+            "serial_recent": tools.get_recent,
+            "serial_tail": tools.get_tail,
+            "serial_list_ports": self._list_ports,
+            "serial_find_pico": self._find_pico,
+            "serial_batch": self._batch,
+        }
+        # Parameters each handler takes, so extra argument keys can be ignored
+        self._signatures = {name: inspect.signature(handler)
+                            for name, handler in self._dispatch.items()}
     
     def get_tools(self) -> List[Dict[str, Any]]:
         """
@@ -123,6 +178,29 @@ class CopilotSerialToolMCPServer:
                     "required": ["data"]
                 }
             },
+            {
+                "name": "serial_connect_and_send",
+                "description": "Connect daemon to a serial port and send data in one step. Auto-detects Raspberry Pi Pico if port not specified. Same as serial_daemon_connect followed by serial_send_data, in a single round-trip.",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "data": {
+                            "type": "string",
+                            "description": "Data string to send to device once connected (newline will be added automatically)"
+                        },
+                        "port": {
+                            "type": "string",
+                            "description": "Serial port to connect to (e.g., COM9). If omitted, auto-detect Raspberry Pi Pico."
+                        },
+                        "baudrate": {
+                            "type": "integer",
+                            "description": "Baud rate for serial connection",
+                            "default": 115200
+                        }
+                    },
+                    "required": ["data"]
+                }
+            },
             {
                 "name": "serial_set_echo",
                 "description": "Enable or disable live console echo of serial data. When enabled, all incoming serial data is printed to the daemon's log/console in real-time. Useful for monitoring device output while debugging.",
@@ -221,6 +299,34 @@ class CopilotSerialToolMCPServer:
                     "type": "object",
                     "properties": {}
                 }
+            },
+            {
+                "name": "serial_batch",
+                "description": "Run several serial tools in one call, e.g. status + tail + recent. Returns one result per request, in order.",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "requests": {
+                            "type": "array",
+                            "description": "Tool calls to run in order, each {\"tool\": name, \"arguments\": {...}}",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "tool": {
+                                        "type": "string",
+                                        "description": "Name of any other serial tool"
+                                    },
+                                    "arguments": {
+                                        "type": "object",
+                                        "description": "Arguments for that tool"
+                                    }
+                                },
+                                "required": ["tool"]
+                            }
+                        }
+                    },
+                    "required": ["requests"]
+                }
             }
         ]
     
@@ -235,86 +341,45 @@ class CopilotSerialToolMCPServer:
         Returns:
             Tool result
         """
+        # Tools block on the daemon socket, SQLite and port enumeration, run them
+        # on the default thread pool so the event loop stays free
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._call_tool, tool_name, arguments)
+    
+    def _call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Look up and run a tool (errors come back as results)"""
+        handler = self._dispatch.get(tool_name) if isinstance(tool_name, str) else None
+        if handler is None:
+            return {
+                "success": False,
+                "error": f"Unknown tool: {tool_name}"
+            }
+        
+        if arguments is None:
+            arguments = {}
+        elif not isinstance(arguments, dict):
+            return {
+                "success": False,
+                "error": "Invalid arguments",
+                "message": f"Invalid arguments for {tool_name}: expected an object"
+            }
+        
+        # Ignore keys the tool doesn't take (like the old per-key get() did), then
+        # check required arguments before calling so a TypeError from inside the
+        # tool isn't mistaken for bad arguments
+        signature = self._signatures[tool_name]
         try:
-            # Route to appropriate daemon tool
-            if tool_name == "serial_daemon_start":
-                auto_connect = arguments.get("auto_connect", False)
-                port = arguments.get("port", "COM9")
-                baudrate = arguments.get("baudrate", 115200)
-                max_records = arguments.get("max_records", 10000)
-                cleanup_interval = arguments.get("cleanup_interval", 60)
-                return self.daemon_tools.start_daemon(
-                    auto_connect=auto_connect, 
-                    port=port, 
-                    baudrate=baudrate,
-                    max_records=max_records,
-                    cleanup_interval=cleanup_interval
-                )
-            
-            elif tool_name == "serial_daemon_stop":
-                return self.daemon_tools.stop_daemon()
-            
-            elif tool_name == "serial_daemon_status":
-                return self.daemon_tools.get_status()
-            
-            elif tool_name == "serial_daemon_connect":
-                port = arguments.get("port")  # Optional - will auto-detect if None
-                baudrate = arguments.get("baudrate", 115200)
-                return self.daemon_tools.connect_port(port, baudrate)
-            
-            elif tool_name == "serial_daemon_disconnect":
-                return self.daemon_tools.disconnect_port()
-            
-            elif tool_name == "serial_send_data":
-                data = arguments["data"]
-                return self.daemon_tools.send_data(data)
-            
-            elif tool_name == "serial_set_echo":
-                enabled = arguments["enabled"]
-                return self.daemon_tools.set_echo(enabled)
-            
-            elif tool_name == "serial_query":
-                sql = arguments["sql"]
-                params = arguments.get("params", [])
-                return self.daemon_tools.query_data(sql, params)
-            
-            elif tool_name == "serial_recent":
-                seconds = arguments.get("seconds", 60)
-                port = arguments.get("port")
-                session_id = arguments.get("session_id")
-                limit = arguments.get("limit", 1000)
-                return self.daemon_tools.get_recent(seconds, port, session_id, limit)
-            
-            elif tool_name == "serial_tail":
-                lines = arguments.get("lines", 100)
-                port = arguments.get("port")
-                session_id = arguments.get("session_id")
-                return self.daemon_tools.get_tail(lines, port, session_id)
-            
-            elif tool_name == "serial_list_ports":
-                from mcp_daemon_tools import find_serial_ports
-                ports = find_serial_ports()
-                return {
-                    "success": True,
-                    "ports": ports,
-                    "count": len(ports)
-                }
-            
-            elif tool_name == "serial_find_pico":
-                from mcp_daemon_tools import find_pico_ports
-                pico_ports = find_pico_ports()
-                return {
-                    "success": True,
-                    "pico_ports": pico_ports,
-                    "count": len(pico_ports),
-                    "message": f"Found {len(pico_ports)} Raspberry Pi Pico device(s)"
-                }
-            
-            else:
-                return {
-                    "success": False,
-                    "error": f"Unknown tool: {tool_name}"
-                }
+            bound = signature.bind(**{key: value for key, value in arguments.items()
+                                      if key in signature.parameters})
+        except TypeError as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "message": f"Invalid arguments for {tool_name}: {e}"
+            }
+        
+        try:
+            return handler(*bound.args, **bound.kwargs)
         
         except Exception as e:
             return {
@@ -323,32 +388,95 @@ class CopilotSerialToolMCPServer:
                 "message": f"Error executing {tool_name}: {e}"
             }
     
+    def _tool_content(self, tool_name: str, arguments: Dict[str, Any]) -> bytes:
+        """
+        Run a tool and return the tools/call result as serialized JSON
+        
+        The text content is the result as a JSON string: the result is encoded
+        once and the quoted string spliced into the envelope, instead of building
+        and encoding a dict around it. The result itself is dropped as soon as
+        it's encoded.
+        """
+        text = _dumps(_dumps(self._call_tool(tool_name, arguments)).decode('utf-8'))
+        return b'{"content":[{"type":"text","text":' + text + b'}]}'
+    
+    def _list_ports(self) -> Dict[str, Any]:
+        """serial_list_ports tool"""
+        ports = find_serial_ports()
+        return {
+            "success": True,
+            "ports": ports,
+            "count": len(ports)
+        }
+    
+    def _find_pico(self) -> Dict[str, Any]:
+        """serial_find_pico tool"""
+        pico_ports = find_pico_ports()
+        return {
+            "success": True,
+            "pico_ports": pico_ports,
+            "count": len(pico_ports),
+            "message": f"Found {len(pico_ports)} Raspberry Pi Pico device(s)"
+        }
+    
+    def _batch(self, requests: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """serial_batch tool: run each request in order"""
+        results = []
+        for request in requests:
+            if not isinstance(request, dict):
+                results.append({
+                    "success": False,
+                    "error": "Each request must be an object with a 'tool' name"
+                })
+            elif request.get("tool") == "serial_batch":
+                results.append({
+                    "success": False,
+                    "error": "serial_batch can't be nested"
+                })
+            else:
+                results.append(self._call_tool(request.get("tool"), request.get("arguments")))
+        return {
+            "success": True,
+            "results": results,
+            "count": len(results)
+        }
+    
     def send_response(self, response: Dict[str, Any]):
-        """Send JSON-RPC response to stdout"""
-        print(json.dumps(response), flush=True)
+        """
+        Send JSON-RPC response to stdout (one UTF-8 line)
+        
+        Only called on the event loop thread, so concurrent requests can't
+        interleave their responses.
+        """
+        self._write(_dumps(response) + b"\n")
+    
+    def send_raw_result(self, request_id: Any, result: bytes):
+        """Send JSON-RPC response whose result is already serialized JSON"""
+        self._write(b'{"jsonrpc":"2.0","id":' + _dumps(request_id) + b',"result":' + result + b'}\n')
+    
+    def _write(self, data: bytes):
+        """Queue output, everything queued in one event loop pass goes out in one write"""
+        if not self._pending_output:
+            asyncio.get_running_loop().call_soon(self._flush_output)
+        self._pending_output.append(data)
+    
+    def _flush_output(self):
+        """Write and flush queued output"""
+        if self._pending_output:
+            out = sys.stdout.buffer
+            out.write(b"".join(self._pending_output))
+            out.flush()
+            self._pending_output.clear()
     
     async def handle_request(self, request: Dict[str, Any]):
-        """Handle incoming MCP request"""
+        """Handle incoming MCP request (must be a dict, see run())"""
+        request_id = request.get("id")
         try:
             method = request.get("method")
-            request_id = request.get("id")
             
             # Handle initialize
             if method == "initialize":
-                self.send_response({
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": {
-                        "protocolVersion": self.protocol_version,
-                        "capabilities": {
-                            "tools": {}
-                        },
-                        "serverInfo": {
-                            "name": self.server_name,
-                            "version": self.server_version
-                        }
-                    }
-                })
+                self.send_raw_result(request_id, self._initialize_result)
             
             # Handle initialized notification (no response)
             elif method == "notifications/initialized":
@@ -356,33 +484,29 @@ class CopilotSerialToolMCPServer:
             
             # Handle tools/list
             elif method == "tools/list":
-                tools = self.get_tools()
-                self.send_response({
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": {"tools": tools}
-                })
+                self.send_raw_result(request_id, self._tools_result)
             
             # Handle tools/call
             elif method == "tools/call":
-                params = request.get("params", {})
+                params = request.get("params") or {}
+                if not isinstance(params, dict):
+                    self.send_response({
+                        "jsonrpc": "2.0",
+                        "id": request_id,
+                        "error": {
+                            "code": -32602,
+                            "message": "Invalid params: expected an object"
+                        }
+                    })
+                    return
                 tool_name = params.get("name")
-                arguments = params.get("arguments", {})
+                arguments = params.get("arguments")  # None/non-object handled by _call_tool
                 
-                result = await self.handle_tool_call(tool_name, arguments)
-                
-                self.send_response({
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": {
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": json.dumps(result, indent=2)
-                            }
-                        ]
-                    }
-                })
+                # Run and encode on the thread pool, big query results don't hold up
+                # the event loop while they're serialized
+                loop = asyncio.get_running_loop()
+                content = await loop.run_in_executor(None, self._tool_content, tool_name, arguments)
+                self.send_raw_result(request_id, content)
             
             # Unknown method
             else:
@@ -398,7 +522,7 @@ class CopilotSerialToolMCPServer:
         except Exception as e:
             self.send_response({
                 "jsonrpc": "2.0",
-                "id": request.get("id"),
+                "id": request_id,
                 "error": {
                     "code": -32603,
                     "message": f"Internal error: {e}"
@@ -409,23 +533,72 @@ class CopilotSerialToolMCPServer:
         """Run MCP server (stdio interface)"""
         print("Serial Monitor Daemon MCP Server started", file=sys.stderr)
         
-        buffer = ""
+        buffer = bytearray()
+        tasks = set()  # Requests in flight (held so they aren't garbage collected)
         
-        # Read from stdin line by line
-        for line in sys.stdin:
-            buffer += line
+        # Read raw bytes from stdin line by line (MCP stdio sends one JSON message
+        # per line, parsed straight from bytes without a text decode). A reader
+        # thread feeds the lines in, so requests run while we wait for the next one.
+        loop = asyncio.get_running_loop()
+        lines: asyncio.Queue = asyncio.Queue()
+        threading.Thread(target=self._read_stdin, args=(loop, lines), daemon=True).start()
+        
+        while True:
+            line = await lines.get()
+            if not line:
+                break  # EOF
+            
+            if buffer:
+                buffer += line  # In-place append, no copy of what's already buffered
+                data = buffer
+            elif line.isspace():
+                continue
+            else:
+                data = line  # Common case: the whole message is on this line
             
             # Try to parse as JSON
             try:
-                request = json.loads(buffer)
-                buffer = ""  # Clear buffer after successful parse
-                await self.handle_request(request)
+                request = _loads(data)
+                buffer.clear()  # Clear buffer after successful parse
+                if not isinstance(request, dict):
+                    # Valid JSON but not a request object (batches aren't supported)
+                    self.send_response({
+                        "jsonrpc": "2.0",
+                        "id": None,
+                        "error": {
+                            "code": -32600,
+                            "message": "Invalid Request: expected a JSON object"
+                        }
+                    })
+                    continue
+                # Don't wait for the answer, responses carry the request id so
+                # they can go out in any order
+                task = asyncio.ensure_future(self.handle_request(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
             except json.JSONDecodeError:
-                # Incomplete JSON, keep buffering
+                # Incomplete JSON (message spread over several lines), keep buffering
+                if data is line:
+                    buffer += line
                 continue
             except Exception as e:
                 print(f"Error processing request: {e}", file=sys.stderr)
-                buffer = ""  # Clear buffer on error
+                buffer.clear()  # Clear buffer on error
+        
+        # Answer everything already received before exiting (one failed request
+        # mustn't cost the others their responses)
+        if tasks:
+            for result in await asyncio.gather(*tasks, return_exceptions=True):
+                if isinstance(result, BaseException):
+                    print(f"Error processing request: {result!r}", file=sys.stderr)
+        self._flush_output()
+    
+    @staticmethod
+    def _read_stdin(loop: asyncio.AbstractEventLoop, lines: asyncio.Queue):
+        """Pass stdin lines to the event loop (b"" at EOF)"""
+        for line in sys.stdin.buffer:
+            loop.call_soon_threadsafe(lines.put_nowait, line)
+        loop.call_soon_threadsafe(lines.put_nowait, b"")
 
 
 async def main():
@@ -436,4 +609,10 @@ async def main():
 
 if __name__ == "__main__":
     print("Copilot Serial Tool Daemon MCP Server started", file=sys.stderr)
-    asyncio.run(main())
+    # uvloop is optional (not available on Windows): faster task scheduling
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -0,0 +1,381 @@
+"""
+Minimal Process Probes
+Answers the two questions the daemon asks about other processes (does a PID
+exist, what is its command line) without importing psutil
+"""
+import os
+import select
+import signal
+import sys
+import time
+from typing import List, Optional
+
+if sys.platform == 'win32':
+    import ctypes
+    from ctypes import wintypes
+
+    _kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    _kernel32.OpenProcess.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+    _kernel32.OpenProcess.restype = wintypes.HANDLE
+    _kernel32.WaitForSingleObject.argtypes = (wintypes.HANDLE, wintypes.DWORD)
+    _kernel32.WaitForSingleObject.restype = wintypes.DWORD
+    _kernel32.GetExitCodeProcess.argtypes = (wintypes.HANDLE, ctypes.POINTER(wintypes.DWORD))
+    _kernel32.GetExitCodeProcess.restype = wintypes.BOOL
+    _kernel32.QueryFullProcessImageNameW.argtypes = (
+        wintypes.HANDLE, wintypes.DWORD, wintypes.LPWSTR, ctypes.POINTER(wintypes.DWORD))
+    _kernel32.QueryFullProcessImageNameW.restype = wintypes.BOOL
+    _kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+    _kernel32.TerminateProcess.argtypes = (wintypes.HANDLE, wintypes.UINT)
+    _kernel32.TerminateProcess.restype = wintypes.BOOL
+    _kernel32.CreateEventW.argtypes = (wintypes.LPVOID, wintypes.BOOL, wintypes.BOOL, wintypes.LPCWSTR)
+    _kernel32.CreateEventW.restype = wintypes.HANDLE
+    _kernel32.OpenEventW.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.LPCWSTR)
+    _kernel32.OpenEventW.restype = wintypes.HANDLE
+    _kernel32.SetEvent.argtypes = (wintypes.HANDLE,)
+    _kernel32.SetEvent.restype = wintypes.BOOL
+    _kernel32.WaitForMultipleObjects.argtypes = (
+        wintypes.DWORD, ctypes.POINTER(wintypes.HANDLE), wintypes.BOOL, wintypes.DWORD)
+    _kernel32.WaitForMultipleObjects.restype = wintypes.DWORD
+elif sys.platform == 'darwin':
+    import ctypes
+    import ctypes.util
+
+    _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+
+# Win32 constants
+PROCESS_TERMINATE = 0x0001
+SYNCHRONIZE = 0x00100000
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+WAIT_OBJECT_0 = 0x00000000
+WAIT_TIMEOUT = 0x00000102
+EVENT_MODIFY_STATE = 0x0002
+_STILL_ACTIVE = 259
+_ERROR_ACCESS_DENIED = 5
+
+# macOS sysctl identifiers
+_CTL_KERN = 1
+_KERN_ARGMAX = 8
+_KERN_PROCARGS2 = 49
+
+
+def pid_exists(pid: int) -> bool:
+    """
+    Check whether a process with the given PID exists
+
+    Args:
+        pid: Process ID
+
+    Returns:
+        True if the process exists (even if owned by another user)
+    """
+    if pid <= 0:
+        return False
+
+    if sys.platform == 'win32':
+        handle = open_process(pid, PROCESS_QUERY_LIMITED_INFORMATION)
+        if not handle:
+            # Access denied means the process exists but we can't open it
+            return ctypes.get_last_error() == _ERROR_ACCESS_DENIED
+        try:
+            code = wintypes.DWORD()
+            if not _kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+                return True
+            return code.value == _STILL_ACTIVE
+        finally:
+            close_handle(handle)
+
+    try:
+        os.kill(pid, 0)  # Signal 0: existence/permission check only
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, but owned by another user
+    except OSError:
+        return False
+    return True
+
+
+def cmdline(pid: int) -> Optional[List[str]]:
+    """
+    Get the command line of a process
+
+    On Windows only the executable image path is available without reading
+    the target's memory, so the result is a single-element list.
+
+    Args:
+        pid: Process ID
+
+    Returns:
+        List of arguments, or None if the process is gone or can't be inspected
+    """
+    try:
+        if sys.platform == 'win32':
+            return _win_image_name(pid)
+        if sys.platform == 'darwin':
+            return _darwin_cmdline(pid)
+        with open(f"/proc/{pid}/cmdline", 'rb') as f:
+            raw = f.read()
+    except OSError:
+        return None
+
+    return [arg.decode('utf-8', errors='replace') for arg in raw.split(b"\0") if arg]
+
+
+def _win_image_name(pid: int) -> Optional[List[str]]:
+    """Windows: full path of the process executable"""
+    handle = open_process(pid, PROCESS_QUERY_LIMITED_INFORMATION)
+    if not handle:
+        return None
+    try:
+        size = wintypes.DWORD(32768)
+        buf = ctypes.create_unicode_buffer(size.value)
+        if not _kernel32.QueryFullProcessImageNameW(handle, 0, buf, ctypes.byref(size)):
+            return None
+        return [buf.value]
+    finally:
+        close_handle(handle)
+
+
+def _darwin_cmdline(pid: int) -> Optional[List[str]]:
+    """macOS: argv via sysctl(KERN_PROCARGS2)"""
+    argmax = ctypes.c_int()
+    size = ctypes.c_size_t(ctypes.sizeof(argmax))
+    mib = (ctypes.c_int * 2)(_CTL_KERN, _KERN_ARGMAX)
+    if _libc.sysctl(mib, 2, ctypes.byref(argmax), ctypes.byref(size), None, 0) != 0:
+        return None
+
+    buf = ctypes.create_string_buffer(argmax.value)
+    size = ctypes.c_size_t(argmax.value)
+    mib = (ctypes.c_int * 3)(_CTL_KERN, _KERN_PROCARGS2, pid)
+    if _libc.sysctl(mib, 3, buf, ctypes.byref(size), None, 0) != 0:
+        return None
+
+    # Layout: int argc, exec path, NUL padding, argv[0..argc), environment
+    raw = buf.raw[:size.value]
+    argc = int.from_bytes(raw[:4], sys.byteorder)
+    parts = [part for part in raw[4:].split(b"\0") if part]
+    return [arg.decode('utf-8', errors='replace') for arg in parts[1:argc + 1]]
+
+
+def open_ref(pid: int):
+    """
+    Open a reference to this exact process for a stop sequence
+
+    Linux: a pidfd. Windows: one handle with SYNCHRONIZE, PROCESS_TERMINATE
+    and query access, used for both the exit wait and TerminateProcess.
+    Signals, waits and kills done through it can't reach a different
+    process that later reuses the PID.
+
+    Args:
+        pid: Process ID
+
+    Returns:
+        The reference (release with close_ref), or None if gone or unsupported
+    """
+    if sys.platform == 'win32':
+        return open_process(pid, SYNCHRONIZE | PROCESS_TERMINATE | PROCESS_QUERY_LIMITED_INFORMATION) or None
+    if not hasattr(os, 'pidfd_open'):  # Linux 5.3+, Python 3.9+
+        return None
+    try:
+        return os.pidfd_open(pid)
+    except OSError:
+        return None
+
+
+def close_ref(ref):
+    """Release a reference from open_ref (None is ignored)"""
+    if ref is None:
+        return
+    if sys.platform == 'win32':
+        close_handle(ref)
+    else:
+        os.close(ref)
+
+
+def ref_running(ref) -> bool:
+    """
+    True if the process behind an open_ref() reference hasn't exited
+
+    Unlike a PID probe this can't be fooled by PID reuse: the reference
+    stays tied to the original process.
+    """
+    if sys.platform == 'win32':
+        return handle_running(ref)
+    return not select.select([ref], [], [], 0)[0]  # A pidfd turns readable on exit
+
+
+def send_signal(pid: int, sig: int, ref=None) -> bool:
+    """
+    POSIX: send a signal, through ref (a pidfd) when one is given
+
+    Returns:
+        True if the signal was delivered
+    """
+    try:
+        if ref is not None:
+            signal.pidfd_send_signal(ref, sig)
+        else:
+            os.kill(pid, sig)
+    except OSError:
+        return False
+    return True
+
+
+def wait_exit(pid: int, timeout: float, ref=None) -> bool:
+    """
+    Wait for a process to exit
+
+    Blocks on the OS exit notification where there is one (pidfd on Linux,
+    kqueue on macOS/BSD, the process handle on Windows), otherwise polls.
+    An exited but unreaped child counts as gone.
+
+    Args:
+        pid: Process ID
+        timeout: Maximum seconds to wait
+        ref: Existing reference for pid (from open_ref), if any
+
+    Returns:
+        True if the process is gone, False on timeout
+    """
+    if sys.platform == 'win32':
+        if ref is not None:
+            return _kernel32.WaitForSingleObject(ref, int(timeout * 1000)) != WAIT_TIMEOUT
+        handle = open_process(pid, SYNCHRONIZE)
+        if not handle:
+            return not pid_exists(pid)
+        try:
+            return _kernel32.WaitForSingleObject(handle, int(timeout * 1000)) != WAIT_TIMEOUT
+        finally:
+            close_handle(handle)
+
+    if ref is not None:
+        return bool(select.select([ref], [], [], timeout)[0])
+    if hasattr(os, 'pidfd_open'):  # Linux 5.3+, Python 3.9+
+        try:
+            fd = os.pidfd_open(pid)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            pass  # Kernel without pidfd support
+        else:
+            try:
+                return bool(select.select([fd], [], [], timeout)[0])
+            finally:
+                os.close(fd)
+    elif hasattr(select, 'kqueue'):
+        kq = select.kqueue()
+        try:
+            kq.control([select.kevent(pid, filter=select.KQ_FILTER_PROC,
+                                      flags=select.KQ_EV_ADD | select.KQ_EV_ONESHOT,
+                                      fflags=select.KQ_NOTE_EXIT)], 0)
+            return bool(kq.control(None, 1, timeout))
+        except ProcessLookupError:
+            return True
+        except OSError:
+            pass
+        finally:
+            kq.close()
+
+    # Fallback: poll with backoff
+    deadline = time.monotonic() + timeout
+    delay = 0.01
+    while pid_exists(pid):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.1)
+    return True
+
+
+def reap(pid: int):
+    """
+    POSIX: collect the exit status of a child that has exited
+
+    The daemon is a child of whichever process started it; without this it
+    stays a zombie (and looks alive to pid_exists) until that process exits.
+    Does nothing if the process is still running or isn't our child.
+
+    Args:
+        pid: Process ID
+    """
+    if sys.platform == 'win32':
+        return
+    try:
+        os.waitpid(pid, os.WNOHANG)
+    except ChildProcessError:
+        pass
+
+
+def terminate(pid: int, ref=None) -> bool:
+    """
+    Kill a process immediately (TerminateProcess on Windows, SIGKILL elsewhere)
+
+    Args:
+        pid: Process ID
+        ref: Existing reference for pid (from open_ref), if any
+
+    Returns:
+        True if the kill was delivered
+    """
+    if sys.platform == 'win32':
+        if ref is not None:
+            return bool(_kernel32.TerminateProcess(ref, 1))
+        handle = open_process(pid, PROCESS_TERMINATE)
+        if not handle:
+            return False
+        try:
+            return bool(_kernel32.TerminateProcess(handle, 1))
+        finally:
+            close_handle(handle)
+
+    return send_signal(pid, signal.SIGKILL, ref)
+
+
+# === Windows handle helpers ===
+
+def open_process(pid: int, access: int):
+    """Windows: OpenProcess wrapper (returns a falsy handle on failure)"""
+    return _kernel32.OpenProcess(access, False, pid)
+
+
+def handle_running(handle) -> bool:
+    """Windows: True if the process behind a SYNCHRONIZE handle hasn't exited"""
+    return _kernel32.WaitForSingleObject(handle, 0) == WAIT_TIMEOUT
+
+
+def close_handle(handle):
+    """Windows: CloseHandle wrapper"""
+    _kernel32.CloseHandle(handle)
+
+
+def create_event(name: str):
+    """Windows: create a named manual-reset event, initially unset (falsy on failure)"""
+    return _kernel32.CreateEventW(None, True, False, name)
+
+
+def set_event(name: str) -> bool:
+    """Windows: set a named event created by another process"""
+    handle = _kernel32.OpenEventW(EVENT_MODIFY_STATE, False, name)
+    if not handle:
+        return False
+    try:
+        return bool(_kernel32.SetEvent(handle))
+    finally:
+        close_handle(handle)
+
+
+def wait_event(event, process, timeout: float) -> bool:
+    """
+    Windows: wait until an event is set or a process exits
+
+    Args:
+        event: Event handle
+        process: SYNCHRONIZE handle of the process expected to set it
+        timeout: Maximum seconds to wait
+
+    Returns:
+        True if the event was set, False on timeout or if the process exited first
+    """
+    handles = (wintypes.HANDLE * 2)(event, process)
+    return _kernel32.WaitForMultipleObjects(2, handles, False, int(timeout * 1000)) == WAIT_OBJECT_0
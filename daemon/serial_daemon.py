@@ -15,26 +15,26 @@ from typing import Optional
 # Add vendored dependencies to Python path (self-contained - no pip install needed!)
 def setup_vendored_packages():
     """Add vendored packages to Python path for self-contained execution"""
-    daemon_dir = Path(__file__).parent
-    vendor_dir = daemon_dir / "vendor"
+    vendor_dir = Path(__file__).parent / "vendor"
     
-    if vendor_dir.exists():
-        vendor_packages = [
-            vendor_dir / "pyserial",  # pyserial package
-            vendor_dir / "psutil",    # psutil package
-            vendor_dir / "mcp",       # mcp package
-        ]
-        
-        for package_path in vendor_packages:
-            if package_path.exists():
-                path_str = str(package_path)
-                if path_str not in sys.path:
-                    sys.path.insert(0, path_str)
+    # One directory read instead of a stat() per package
+    try:
+        entries = {e.name: e.path for e in os.scandir(vendor_dir)}
+    except FileNotFoundError:
+        return
+    
+    vendor_packages = [
+        entries[name] for name in ("pyserial", "mcp")  # pyserial, mcp packages
+        if name in entries
+    ]
+    # Several modules call this on import, only the first one adds anything
+    sys.path[:0] = [path for path in vendor_packages if path not in sys.path]
 
 # Setup vendored packages before importing dependencies
 setup_vendored_packages()
 
 # Import our modules
+import proc
 from daemon_manager import DaemonManager
 from db_manager import DatabaseManager
 from serial_handler import SerialHandler
@@ -94,6 +94,11 @@ class SerialDaemon:
         # Running flag
         self.running = False
         self.monitoring = False  # True when actively monitoring a port
+        self._shutdown_requested = False  # Set by the 'shutdown' command
+        
+        # Counters reported by the 'status' command
+        self.start_time = time.time()
+        self.lines_received = 0  # Serial lines received this session (read thread only)
         
         # Setup signal handlers
         signal.signal(signal.SIGTERM, self._signal_handler)
@@ -142,6 +147,10 @@ class SerialDaemon:
             self.daemon_mgr.write_pid("NONE", self.session_id)
             debug_log("DAEMON", f"PID file written: {os.getpid()}")
             
+            # Open command socket (safe now that we hold the lock)
+            self.command_interface.start_server()
+            debug_log("DAEMON", "Command socket listening")
+            
             # SCENARIO 2.6: Initialize database (handles corruption)
             debug_log("DATABASE", "Initializing database...")
             try:
@@ -168,7 +177,7 @@ class SerialDaemon:
             # Log daemon start
             debug_log("DATABASE", "Logging daemon start event...")
             self.db_mgr.insert_immediate(
-                timestamp=datetime.now().isoformat(),
+                timestamp=time.time_ns() // 1000,
                 port="SYSTEM",
                 data=f"DAEMON_STARTED (session: {self.session_id}) - No port connected yet",
                 session_id=self.session_id
@@ -234,7 +243,7 @@ class SerialDaemon:
                 
                 # Log error
                 self.db_mgr.insert_immediate(
-                    timestamp=datetime.now().isoformat(),
+                    timestamp=time.time_ns() // 1000,
                     port=port,
                     data=f"PORT_CONNECTION_FAILED",
                     session_id=self.session_id
@@ -258,7 +267,7 @@ class SerialDaemon:
         except Exception as e:
             print(f"Unexpected error connecting to {port}: {e}")
             self.db_mgr.insert_immediate(
-                timestamp=datetime.now().isoformat(),
+                timestamp=time.time_ns() // 1000,
                 port=port,
                 data=f"PORT_CONNECTION_ERROR: {e}",
                 session_id=self.session_id
@@ -291,7 +300,7 @@ class SerialDaemon:
             
             # Log disconnect
             self.db_mgr.insert_immediate(
-                timestamp=datetime.now().isoformat(),
+                timestamp=time.time_ns() // 1000,
                 port=self.current_port or "UNKNOWN",
                 data=f"PORT_DISCONNECTED_BY_USER",
                 session_id=self.session_id
@@ -333,7 +342,7 @@ class SerialDaemon:
             # Log the change
             status = "ENABLED" if enabled else "DISABLED"
             self.db_mgr.insert_immediate(
-                timestamp=datetime.now().isoformat(),
+                timestamp=time.time_ns() // 1000,
                 port=self.current_port or "UNKNOWN",
                 data=f"CONSOLE_ECHO_{status}",
                 session_id=self.session_id
@@ -354,15 +363,21 @@ class SerialDaemon:
         
         try:
             # Main loop - process commands and flush database
+            next_flush = time.monotonic() + 1.0
             while self.running:
-                # Check for incoming commands
-                self._process_commands()
+                # Sleep in select() until a client arrives or the next flush is due;
+                # commands already waiting are handled without blocking
+                self._process_commands(timeout=max(0.0, next_flush - time.monotonic()))
+                if self._shutdown_requested:
+                    self.stop()
+                    break
                 
-                # Periodic database flush (every second)
-                if self.db_mgr:
-                    self.db_mgr.flush()
-                
-                time.sleep(0.1)  # 100ms poll interval
+                # Periodic database flush (every second, not on every command)
+                now = time.monotonic()
+                if now >= next_flush:
+                    if self.db_mgr:
+                        self.db_mgr.flush()
+                    next_flush = now + 1.0
         
         except KeyboardInterrupt:
             print("\nKeyboard interrupt received")
@@ -370,13 +385,25 @@ class SerialDaemon:
         finally:
             print("Main loop exited")
     
-    def _process_commands(self):
-        """Process any pending commands from command interface"""
-        cmd = self.command_interface.check_for_command()
+    def _process_commands(self, timeout: float = 0):
+        """
+        Process pending commands from command interface
         
-        if cmd is None:
-            return
+        Args:
+            timeout: Seconds to wait for a command before returning (0 = don't wait)
+        """
+        self.command_interface.process_commands(self._execute_command, timeout=timeout)
+    
+    def _execute_command(self, cmd: dict) -> dict:
+        """
+        Execute a single command received from a client
+        
+        Args:
+            cmd: Command dictionary (must contain 'command')
         
+        Returns:
+            Response dictionary sent back to the client
+        """
         command_name = cmd.get('command')
         print(f"Processing command: {command_name}")
         
@@ -402,14 +429,22 @@ class SerialDaemon:
                 }
             
             elif command_name == 'write':
-                data = cmd.get('data', '')
+                # Raw bytes arrive as the frame payload, text as 'data'
+                payload = cmd.get('payload')
+                data = cmd.get('data', '') if payload is None else payload
                 if not data:
                     response = {'success': False, 'message': 'No data provided to write'}
                 elif not self.serial_handler or not self.serial_handler.is_connected():
                     response = {'success': False, 'message': 'Not connected to any port'}
                 else:
                     success = self.serial_handler.write(data)
-                    if success:
+                    if success and payload is not None:
+                        response = {
+                            'success': True,
+                            'message': f'Sent {len(payload)} bytes',
+                            'length': len(payload)
+                        }
+                    elif success:
                         response = {
                             'success': True,
                             'message': f'Sent: {data}',
@@ -426,6 +461,11 @@ class SerialDaemon:
                     'status': status
                 }
             
+            elif command_name == 'shutdown':
+                # Stopped by run() once this response has been sent
+                self._shutdown_requested = True
+                response = {'success': True, 'message': 'Daemon shutting down'}
+            
             elif command_name == 'set_echo':
                 enabled = cmd.get('enabled', False)
                 success = self.set_echo(enabled)
@@ -456,8 +496,7 @@ class SerialDaemon:
                 'message': f'Error executing command: {e}'
             }
         
-        # Send response
-        self.command_interface.send_response(response)
+        return response
     
     def stop(self):
         """Stop daemon gracefully (implements shutdown scenarios)"""
@@ -471,7 +510,7 @@ class SerialDaemon:
         if self.db_mgr:
             try:
                 self.db_mgr.insert_immediate(
-                    timestamp=datetime.now().isoformat(),
+                    timestamp=time.time_ns() // 1000,
                     port="SYSTEM",
                     data="DAEMON_STOPPED_CLEAN",
                     session_id=self.session_id
@@ -501,6 +540,12 @@ class SerialDaemon:
             except Exception as e:
                 print(f"Error closing database: {e}")
         
+        # Close command socket
+        try:
+            self.command_interface.stop_server()
+        except Exception as e:
+            print(f"Error closing command socket: {e}")
+        
         # Release lock and remove PID
         try:
             self.daemon_mgr.remove_pid()
@@ -511,9 +556,10 @@ class SerialDaemon:
     def _on_serial_data(self, data: str):
         """Callback for serial data (called from read thread)"""
         if self.db_mgr and self.current_port:
+            self.lines_received += 1
             try:
                 self.db_mgr.insert(
-                    timestamp=datetime.now().isoformat(),
+                    timestamp=time.time_ns() // 1000,
                     port=self.current_port,
                     data=data,
                     session_id=self.session_id
@@ -533,7 +579,7 @@ class SerialDaemon:
         if self.db_mgr and self.current_port:
             try:
                 self.db_mgr.insert_immediate(
-                    timestamp=datetime.now().isoformat(),
+                    timestamp=time.time_ns() // 1000,
                     port=self.current_port,
                     data=f"=== {event} ===",
                     session_id=self.session_id
@@ -548,13 +594,47 @@ class SerialDaemon:
         Returns:
             Dict with status information
         """
-        return {
+        status = {
             'running': self.running,
             'monitoring': self.monitoring,
             'port': self.current_port,
             'baudrate': self.current_baudrate,
-            'session_id': self.session_id
+            'session_id': self.session_id,
+            'lines_received': self.lines_received,
+            'uptime': time.time() - self.start_time
         }
+        
+        # Lines stored for the session (the same count clients read from the
+        # database), a single-row lookup
+        if self.db_mgr:
+            try:
+                status['lines_captured'] = self.db_mgr.get_line_count(self.session_id)
+            except Exception as e:
+                debug_log("DAEMON", f"Line count failed: {e}", "ERROR")
+        
+        return status
+
+
+def signal_ready():
+    """
+    Tell the process that launched us that startup finished
+    
+    start_daemon passes the write end of a pipe in DAEMON_READY_FD and waits
+    for one byte; if the daemon exits before this, the parent sees EOF instead.
+    On Windows it passes the name of an event to set in DAEMON_READY_EVENT.
+    """
+    event = os.environ.pop('DAEMON_READY_EVENT', None)
+    if event is not None:
+        proc.set_event(event)
+    
+    fd = os.environ.pop('DAEMON_READY_FD', None)
+    if fd is None:
+        return
+    try:
+        os.write(int(fd), b"1")
+        os.close(int(fd))
+    except (OSError, ValueError):
+        pass  # Parent gone or not a valid fd; nothing to signal
 
 
 def main():
@@ -586,6 +666,7 @@ def main():
     if not daemon.start():
         print("Failed to start daemon")
         sys.exit(1)
+    signal_ready()
     
     # Auto-connect to port if specified
     if args.port and not args.no_autoconnect:
@@ -6,20 +6,20 @@ import os
 import sys
 import time
 from pathlib import Path
-from typing import Optional, Callable
+from typing import Optional, Callable, Union
 from datetime import datetime
 from threading import Thread, Event
 
 # === SETUP VENDORED PACKAGES ===
 def setup_vendored_packages():
     """Add vendored packages to Python path"""
-    daemon_dir = Path(__file__).parent
-    vendor_dir = daemon_dir / "vendor"
-    if vendor_dir.exists():
-        for pkg in ["pyserial", "psutil", "mcp"]:
-            pkg_path = vendor_dir / pkg
-            if pkg_path.exists() and str(pkg_path) not in sys.path:
-                sys.path.insert(0, str(pkg_path))
+    # One directory read instead of a stat() per package
+    try:
+        entries = {e.name: e.path for e in os.scandir(Path(__file__).parent / "vendor")}
+    except FileNotFoundError:
+        return
+    paths = [entries[pkg] for pkg in ("pyserial", "mcp") if pkg in entries]
+    sys.path[:0] = [p for p in paths if p not in sys.path]
 
 setup_vendored_packages()
 
@@ -359,12 +359,12 @@ class SerialHandler:
         self.reconnect_start_time = None
         return False
     
-    def write(self, data: str) -> bool:
+    def write(self, data: Union[str, bytes, bytearray]) -> bool:
         """
         Write data to serial port
         
         Args:
-            data: String to write (newline will be added)
+            data: String to write (newline will be added), or raw bytes written as-is
         
         Returns:
             True if written successfully, False otherwise
@@ -374,7 +374,9 @@ class SerialHandler:
             return False
         
         try:
-            self.ser.write(data.encode('utf-8') + b'\n')
+            if isinstance(data, str):
+                data = data.encode('utf-8') + b'\n'
+            self.ser.write(data)
             self.ser.flush()
             return True
         except Exception as e:
@@ -0,0 +1,323 @@
+"""
+Test the daemon command socket without hardware: length-prefixed JSON frames,
+raw payloads, batches, and rejection of malformed frames
+
+Run: python -m unittest tests/test_daemon_commands.py
+"""
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Add daemon directory to path
+DAEMON_DIR = Path(__file__).parent.parent / "daemon"
+sys.path.insert(0, str(DAEMON_DIR))
+
+import daemon_commands
+from daemon_commands import (DaemonCommands, _Connection, _HEADER, _MAX_FRAME,
+                             _dumps, _recv_frame, _send_frame)
+
+
+def frame(message, payload=b""):
+    """Wire bytes of one frame, as _send_frame writes them"""
+    body = _dumps(message)
+    return _HEADER.pack(len(body)) + body + payload
+
+
+class TestFrames(unittest.TestCase):
+    """Frame encoding over a connected socket pair"""
+
+    def setUp(self):
+        self.a, self.b = socket.socketpair()
+        self.b.settimeout(2)
+
+    def tearDown(self):
+        self.a.close()
+        self.b.close()
+
+    def send_raw(self, body: bytes):
+        self.a.sendall(_HEADER.pack(len(body)) + body)
+
+    def test_round_trip(self):
+        message = {'command': 'status', 'n': 3, 'text': 'héllo'}
+        _send_frame(self.a, message)
+        self.assertEqual(_recv_frame(self.b), message)
+
+    def test_raw_payload(self):
+        payload = bytes(range(256)) + b"\r\n\0"
+        _send_frame(self.a, {'command': 'write', 'payload_length': len(payload)}, payload)
+        message = _recv_frame(self.b)
+        self.assertEqual(message, {'command': 'write', 'payload': bytearray(payload)})
+        self.assertNotIn('payload_length', message)
+
+    def test_frames_stay_in_sync(self):
+        _send_frame(self.a, {'command': 'write', 'payload_length': 3}, b"abc")
+        _send_frame(self.a, {'command': 'status'})
+        self.assertEqual(_recv_frame(self.b)['payload'], b"abc")
+        self.assertEqual(_recv_frame(self.b), {'command': 'status'})
+
+    def test_malformed_frames_rejected(self):
+        malformed = [
+            b'[]',
+            b'1',
+            b'"status"',
+            b'null',
+            b'{"batch": {"command": "status"}}',
+            b'{"batch": [1, 2]}',
+            b'{"command": "write", "payload_length": "3"}',
+            b'{"command": "write", "payload_length": -1}',
+            b'not json',
+        ]
+        for body in malformed:
+            with self.subTest(body=body):
+                self.send_raw(body)
+                with self.assertRaises(ValueError):
+                    _recv_frame(self.b)
+
+    def test_oversized_frame_rejected(self):
+        self.a.sendall(_HEADER.pack(_MAX_FRAME + 1))
+        with self.assertRaises(ValueError):
+            _recv_frame(self.b)
+
+    def test_eof(self):
+        self.a.close()
+        with self.assertRaises(ConnectionError):
+            _recv_frame(self.b)
+
+
+class TestReassembly(unittest.TestCase):
+    """Daemon-side frame buffers, fed whatever the socket returned"""
+
+    def test_byte_at_a_time(self):
+        data = (frame({'command': 'write', 'payload_length': 4}, b"\0\1\2\3")
+                + frame({'command': 'status'}))
+        state = _Connection()
+        messages = []
+        for i in range(len(data)):
+            state.inbox += data[i:i + 1]
+            messages += state.frames()
+        self.assertEqual(messages, [{'command': 'write', 'payload': b"\0\1\2\3"},
+                                    {'command': 'status'}])
+        self.assertEqual(state.inbox, b"")
+
+    def test_several_frames_at_once(self):
+        state = _Connection()
+        state.inbox += b"".join(frame({'n': i}) for i in range(3)) + frame({'n': 3})[:5]
+        self.assertEqual(state.frames(), [{'n': 0}, {'n': 1}, {'n': 2}])
+        self.assertEqual(len(state.inbox), 5)  # Start of the next frame kept
+
+    def test_malformed(self):
+        for data in (_HEADER.pack(2) + b"[]", _HEADER.pack(_MAX_FRAME + 1)):
+            with self.subTest(data=data):
+                state = _Connection()
+                state.inbox += data
+                with self.assertRaises(ValueError):
+                    state.frames()
+
+
+class TestCommandServer(unittest.TestCase):
+    """Client and server ends of DaemonCommands in one process"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.received = []
+
+        self.server = DaemonCommands(Path(self._tmp.name), timeout=2)
+        self.server.start_server()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+        self.client = DaemonCommands(Path(self._tmp.name), timeout=2)
+
+    def tearDown(self):
+        self.client.close()
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self.server.stop_server()
+        self._tmp.cleanup()
+
+    def _serve(self):
+        while not self._stop.is_set():
+            self.server.process_commands(self._handle, timeout=0.05)
+
+    def _handle(self, cmd):
+        self.received.append(cmd)
+        response = {'success': True, 'command': cmd['command']}
+        if 'payload' in cmd:
+            response['length'] = len(cmd['payload'])
+        return response
+
+    def connect_raw(self) -> socket.socket:
+        """Plain socket to the server, bypassing the client"""
+        sock = self.client._connect()
+        self.addCleanup(sock.close)
+        return sock
+
+    def test_command(self):
+        response = self.client.send_command('status', verbose=True)
+        self.assertEqual(response, {'success': True, 'command': 'status'})
+        self.assertTrue(self.received[0]['verbose'])
+
+    def test_binary_payload(self):
+        payload = b"\x00\xff\r\n" * 1000
+        response = self.client.send_command('write', payload=payload)
+        self.assertEqual(response['length'], len(payload))
+        self.assertEqual(bytes(self.received[0]['payload']), payload)
+
+    def test_batch(self):
+        results = self.client.send_batch([('connect', {'port': 'COM9'}), ('status', {})])
+        self.assertEqual([r['command'] for r in results], ['connect', 'status'])
+        self.assertEqual(self.received[0]['port'], 'COM9')
+
+    def test_connection_reused(self):
+        self.client.send_command('status')
+        conn = self.client._conn
+        self.client.send_command('status')
+        self.assertIs(self.client._conn, conn)
+
+    def test_malformed_frame_drops_only_that_client(self):
+        for body in (b'[]', b'1', b'{"batch": [1]}'):
+            with self.subTest(body=body):
+                sock = self.connect_raw()
+                sock.settimeout(2)
+                sock.sendall(_HEADER.pack(len(body)) + body)
+                self.assertEqual(sock.recv(16), b"")  # Closed without a reply
+
+        # The server loop is still running and answering other clients
+        self.assertTrue(self._thread.is_alive())
+        self.assertTrue(self.client.send_command('status')['success'])
+        self.assertEqual([cmd['command'] for cmd in self.received], ['status'])
+
+    def test_stalled_client_does_not_block_others(self):
+        stalled = self.connect_raw()
+        data = frame({'command': 'write', 'payload_length': 10}, b"12345")
+        stalled.sendall(data[:-7])  # Header and part of the body
+        time.sleep(0.1)
+        self.assertTrue(self.client.send_command('status')['success'])
+
+        stalled.sendall(data[-7:])  # Rest of the JSON, half the payload
+        time.sleep(0.1)
+        self.assertTrue(self.client.send_command('status')['success'])
+
+        stalled.settimeout(2)
+        stalled.sendall(b"67890")
+        self.assertEqual(_recv_frame(stalled)['length'], 10)
+
+    def test_pipelined_commands(self):
+        sock = self.connect_raw()
+        sock.settimeout(2)
+        sock.sendall(b"".join(frame({'command': f'c{i}'}) for i in range(50)))
+        self.assertEqual([_recv_frame(sock)['command'] for _ in range(50)],
+                         [f'c{i}' for i in range(50)])
+
+    def test_client_not_reading_replies(self):
+        greedy = self.connect_raw()
+        greedy.setblocking(False)
+        request = frame({'command': 'status', 'padding': 'x' * 1000})
+        try:
+            for _ in range(5000):
+                greedy.send(request)
+        except BlockingIOError:
+            pass  # Daemon stopped reading: its replies aren't being taken
+        self.assertTrue(self.client.send_command('status')['success'])
+
+    def test_unreachable(self):
+        self.client.close()
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self.server.stop_server()
+        response = self.client.send_command('status')
+        self.assertFalse(response['success'])
+        self.assertEqual(response['error'], 'DAEMON_UNREACHABLE')
+
+
+class TestCommandServerTCP(TestCommandServer):
+    """The same over loopback TCP, as on Windows"""
+
+    def setUp(self):
+        patcher = mock.patch.object(daemon_commands, '_USE_UNIX_SOCKET', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)  # Runs after tearDown
+        super().setUp()
+
+    def raw_tcp(self) -> socket.socket:
+        """Loopback connection to the daemon that sends no token"""
+        port = int(self.server.port_file.read_text().split()[0])
+        sock = socket.create_connection(('127.0.0.1', port), timeout=2)
+        self.addCleanup(sock.close)
+        return sock
+
+    def test_port_file_private(self):
+        if os.name == 'posix':
+            self.assertEqual(self.server.port_file.stat().st_mode & 0o777, 0o600)
+
+    def test_wrong_token_dropped(self):
+        for first in ({'token': 'guess'}, {'token': None}, {'command': 'status'}):
+            with self.subTest(first=first):
+                sock = self.raw_tcp()
+                sock.sendall(frame(first) + frame({'command': 'shutdown'}))
+                self.assertEqual(sock.recv(16), b"")  # Closed without a reply
+        self.assertEqual(self.received, [])
+
+    def test_token_sent_once_per_connection(self):
+        sock = self.raw_tcp()
+        token = self.server.port_file.read_text().split()[1]
+        sock.sendall(frame({'token': token}) + frame({'command': 'a'}) + frame({'command': 'b'}))
+        self.assertEqual([_recv_frame(sock)['command'] for _ in range(2)], ['a', 'b'])
+
+
+class TestServerLoop(unittest.TestCase):
+    """process_commands() called directly, as the daemon's main loop does"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.server = DaemonCommands(Path(self._tmp.name), timeout=2)
+        self.server.start_server()
+
+    def tearDown(self):
+        self.server.stop_server()
+        self._tmp.cleanup()
+
+    def test_busy_client_does_not_hold_the_loop(self):
+        client = DaemonCommands(Path(self._tmp.name), timeout=2)
+        sock = client._connect()
+        self.addCleanup(sock.close)
+        handled = []
+
+        def handler(cmd):
+            # The client always has its next command waiting (bounded, so a
+            # loop that never returns fails the test instead of hanging it)
+            handled.append(cmd)
+            if len(handled) < 1000:
+                _send_frame(sock, {'command': 'status'})
+            return {'success': True}
+
+        _send_frame(sock, {'command': 'status'})
+        for calls in range(1, 4):
+            self.server.process_commands(handler, timeout=1)
+            # One pass per call, so the daemon's flush runs in between
+            self.assertEqual(len(handled), calls)
+            _recv_frame(sock)
+
+    def test_timeout_when_idle(self):
+        started = time.monotonic()
+        self.assertEqual(self.server.process_commands(lambda cmd: {}, timeout=0.1), 0)
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+    def test_batch_counted(self):
+        client = DaemonCommands(Path(self._tmp.name), timeout=2)
+        sock = client._connect()
+        self.addCleanup(sock.close)
+        _send_frame(sock, {'batch': [{'command': 'a'}, {'command': 'b'}]})
+        self.assertEqual(self.server.process_commands(lambda cmd: {'success': True}, timeout=1), 2)
+        self.assertEqual(len(_recv_frame(sock)['results']), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Test the daemon manager's PID record without hardware or a running daemon:
+binary round trip, and records written by older daemons
+
+Run: python -m unittest tests/test_daemon_manager.py
+"""
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add daemon directory to path
+DAEMON_DIR = Path(__file__).parent.parent / "daemon"
+sys.path.insert(0, str(DAEMON_DIR))
+
+from daemon_manager import DaemonManager
+
+
+class TestPidRecord(unittest.TestCase):
+    """write_pid() and read_pid() against a private state directory"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.mgr = DaemonManager(Path(self._tmp.name))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_round_trip(self):
+        port = "/dev/serial/by-id/usb-Raspberry_Pi_Pico_E6614C311B8B5A2F-if00"
+        self.mgr.write_pid(port, "session_1700000000")
+
+        self.assertEqual(self.mgr.pid_file.stat().st_size, DaemonManager._PID_FMT.size)
+        pid, timestamp, read_port, session_id = DaemonManager(self.mgr.base_dir).read_pid()
+        self.assertEqual((pid, read_port, session_id), (os.getpid(), port, "session_1700000000"))
+        self.assertGreater(timestamp, 0)
+
+    def test_default_session_id(self):
+        self.mgr.write_pid("COM9")
+        self.assertTrue(self.mgr.read_pid()[3].startswith("session_"))
+
+    def test_legacy_text_record(self):
+        self.mgr.pid_file.write_text("123\n1700000000.5\nCOM9\nsession_x\n")
+        self.assertEqual(self.mgr.read_pid(), (123, 1700000000.5, "COM9", "session_x"))
+
+    def test_too_long_rejected(self):
+        with self.assertRaises(ValueError):
+            self.mgr.write_pid("COM" + "9" * 200)
+        with self.assertRaises(ValueError):
+            self.mgr.write_pid("COM9", "s" * 65)
+        self.assertFalse(self.mgr.pid_file.exists())  # Nothing truncated written
+
+    def test_missing(self):
+        self.assertIsNone(self.mgr.read_pid())
+
+
+if __name__ == "__main__":
+    unittest.main()
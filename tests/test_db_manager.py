@@ -0,0 +1,326 @@
+"""
+Test the database manager without hardware: SELECT-only queries, migration of
+older database layouts, and line counts under cleanup
+
+Run: python -m unittest tests/test_db_manager.py
+"""
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+# Add daemon directory to path
+DAEMON_DIR = Path(__file__).parent.parent / "daemon"
+sys.path.insert(0, str(DAEMON_DIR))
+
+from db_manager import DatabaseManager, _iso_to_us
+
+
+def now_us() -> int:
+    """Current time in microseconds since the epoch (the stored timestamp unit)"""
+    return time.time_ns() // 1000
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Gives each test its own database file"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self._tmp.name) / "serial_data.db"
+        self._managers = []
+
+    def tearDown(self):
+        for db in self._managers:
+            db.close()
+        self._tmp.cleanup()
+
+    def open_db(self, **kwargs) -> DatabaseManager:
+        """Open a manager that is closed after the test (no cleanup runs by itself)"""
+        kwargs.setdefault('cleanup_interval', 3600)
+        db = DatabaseManager(self.db_path, **kwargs)
+        self._managers.append(db)
+        return db
+
+    def table_count(self, db: DatabaseManager, table: str = "serial_lines") -> int:
+        """Row count straight from the write connection"""
+        return db.connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def assert_counts_consistent(self, db: DatabaseManager):
+        """Running total and per-session counts match the rows actually stored"""
+        self.assertEqual(db.get_line_count(), self.table_count(db))
+        rows = db.connection.execute("""
+            SELECT s.name, s.line_count,
+                   (SELECT COUNT(*) FROM serial_lines WHERE session_id = s.id)
+            FROM sessions s
+        """).fetchall()
+        for name, stored, actual in rows:
+            self.assertEqual(stored, actual, f"line_count of session {name}")
+            self.assertEqual(db.get_line_count(name), actual)
+
+
+class TestSelectOnly(DatabaseTestCase):
+    """query() only runs statements that read"""
+
+    def setUp(self):
+        super().setUp()
+        self.db = self.open_db()
+        for i in range(5):
+            self.db.insert(now_us(), "COM1", f"line {i}", "s1")
+        self.db.flush()
+
+    def test_allowed_queries(self):
+        allowed = [
+            "SELECT * FROM serial_data",
+            "  select count(*) AS n FROM serial_data",
+            "SELECT upper(data) FROM serial_data WHERE data LIKE ?",
+            "WITH last AS (SELECT * FROM serial_data ORDER BY id DESC LIMIT 2) SELECT * FROM last",
+            "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 3) SELECT x FROM n",
+            "SELECT name, line_count FROM sessions",
+        ]
+        for sql in allowed:
+            with self.subTest(sql=sql):
+                params = ("line%",) if "?" in sql else ()
+                self.assertIsInstance(self.db.query(sql, params), list)
+
+        self.assertEqual(self.db.query("SELECT count(*) AS n FROM serial_data")[0]['n'], 5)
+
+    def test_denied_statements(self):
+        denied = [
+            "DELETE FROM serial_lines",
+            "delete from serial_data",
+            "UPDATE serial_lines SET data = 'x'",
+            "INSERT INTO serial_data (timestamp, port, data, session_id) VALUES (0, 'a', 'b', 'c')",
+            "DROP TABLE serial_lines",
+            "CREATE TABLE evil (x)",
+            "PRAGMA query_only = OFF",
+            "ATTACH DATABASE ':memory:' AS other",
+            "VACUUM",
+            "WITH x AS (SELECT 1) DELETE FROM serial_lines",
+            "WITH x AS (SELECT 1) UPDATE serial_lines SET data = 'x'",
+        ]
+        for sql in denied:
+            with self.subTest(sql=sql):
+                with self.assertRaises(ValueError):
+                    self.db.query(sql)
+
+    def test_stacked_statement_not_run(self):
+        with self.assertRaises((ValueError, sqlite3.Error)):
+            self.db.query("SELECT 1; DELETE FROM serial_lines")
+
+        # Nothing above changed the data
+        self.assertEqual(self.table_count(self.db), 5)
+
+    def test_read_only_manager(self):
+        reader = self.open_db(read_only=True)
+        self.assertEqual(len(reader.get_tail(10)), 5)
+        self.assertEqual(reader.get_line_count(), 5)
+        self.assertEqual(reader.get_line_count("s1"), 5)
+        with self.assertRaises(ValueError):
+            reader.query("DELETE FROM serial_lines")
+
+
+class TestLegacyMigration(DatabaseTestCase):
+    """Older database layouts are converted on open, keeping every row"""
+
+    def create_legacy_db(self, rows, timestamp_type: str = "TEXT"):
+        """The original single-table schema (TEXT timestamps, later INTEGER)"""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(f"""
+            CREATE TABLE serial_data (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp {timestamp_type} NOT NULL,
+                port TEXT NOT NULL,
+                data TEXT NOT NULL,
+                session_id TEXT NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX idx_timestamp ON serial_data(timestamp)")
+        conn.executemany(
+            "INSERT INTO serial_data (timestamp, port, data, session_id) VALUES (?, ?, ?, ?)",
+            rows
+        )
+        conn.commit()
+        conn.close()
+
+    def test_iso_timestamps(self):
+        stamps = [datetime(2025, 3, 1, 12, 0, i, 250000).isoformat() for i in range(4)]
+        rows = [
+            (stamps[0], "COM1", "boot", "session_a"),
+            (stamps[1], "COM2", "hello", "session_a"),
+            (stamps[2], "COM1", "again", "session_b"),
+            (stamps[3], "COM1", "bye", "session_b"),
+        ]
+        self.create_legacy_db(rows)
+
+        db = self.open_db()
+
+        # serial_data is now the view over serial_lines
+        kind = db.connection.execute(
+            "SELECT type FROM sqlite_master WHERE name = 'serial_data'"
+        ).fetchone()[0]
+        self.assertEqual(kind, "view")
+
+        migrated = db.query("SELECT id, timestamp, port, data, session_id FROM serial_data ORDER BY id")
+        self.assertEqual(
+            [(r['id'], r['timestamp'], r['port'], r['data'], r['session_id']) for r in migrated],
+            [(i + 1, _iso_to_us(ts), port, data, session)
+             for i, (ts, port, data, session) in enumerate(rows)]
+        )
+
+        # Local-time ISO strings become epoch microseconds
+        self.assertEqual(migrated[0]['timestamp'],
+                         int(datetime.fromisoformat(stamps[0]).timestamp() * 1_000_000))
+
+        self.assertEqual(self.table_count(db, "ports"), 2)
+        self.assertEqual(self.table_count(db, "sessions"), 2)
+        self.assert_counts_consistent(db)
+        self.assertEqual(db.get_line_count("session_b"), 2)
+
+        # New rows continue after the migrated ids
+        db.insert_immediate(now_us(), "COM2", "new", "session_c")
+        self.assertEqual(db.get_tail(1)[0]['id'], 5)
+        self.assert_counts_consistent(db)
+
+    def test_integer_timestamps(self):
+        rows = [(1_700_000_000_000_000 + i, "COM3", f"line {i}", "s") for i in range(3)]
+        self.create_legacy_db(rows, timestamp_type="INTEGER")
+
+        db = self.open_db()
+        migrated = db.query("SELECT timestamp FROM serial_data ORDER BY id")
+        self.assertEqual([r['timestamp'] for r in migrated], [ts for ts, *_ in rows])
+        self.assert_counts_consistent(db)
+
+    def test_sessions_without_line_count(self):
+        # Dimension-table layout from before sessions.line_count existed
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript("""
+            CREATE TABLE ports (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+            CREATE TABLE sessions (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+            CREATE TABLE serial_lines (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp INTEGER NOT NULL,
+                port_id INTEGER NOT NULL REFERENCES ports(id),
+                data TEXT NOT NULL,
+                session_id INTEGER NOT NULL REFERENCES sessions(id)
+            );
+            INSERT INTO ports (name) VALUES ('COM1');
+            INSERT INTO sessions (name) VALUES ('s1'), ('s2');
+            INSERT INTO serial_lines (timestamp, port_id, data, session_id)
+            VALUES (1, 1, 'a', 1), (2, 1, 'b', 1), (3, 1, 'c', 2);
+        """)
+        conn.close()
+
+        db = self.open_db()
+        self.assertEqual(db.get_line_count("s1"), 2)
+        self.assertEqual(db.get_line_count("s2"), 1)
+        self.assert_counts_consistent(db)
+
+
+class TestCleanupCounts(DatabaseTestCase):
+    """Running and per-session counts stay exact when cleanup deletes rows"""
+
+    def test_cleanup_keeps_counts(self):
+        db = self.open_db(max_records=10)
+        for i in range(25):
+            db.insert(now_us(), "COM1", f"line {i}", "old" if i < 12 else "new")
+        db.flush()
+        self.assert_counts_consistent(db)
+        self.assertEqual(db.get_line_count(), 25)
+
+        db._cleanup_old_records()
+
+        self.assertEqual(self.table_count(db), 10)
+        self.assert_counts_consistent(db)
+        self.assertEqual(db.get_line_count("old"), 0)
+        self.assertEqual(db.get_line_count("new"), 10)
+
+        # The newest rows are the ones kept
+        self.assertEqual([r['data'] for r in db.get_tail(10)],
+                         [f"line {i}" for i in range(24, 14, -1)])
+
+    def test_cleanup_below_limit_is_noop(self):
+        db = self.open_db(max_records=10)
+        for i in range(5):
+            db.insert(now_us(), "COM1", f"line {i}", "s")
+        db.flush()
+
+        db._cleanup_old_records()
+
+        self.assertEqual(self.table_count(db), 5)
+        self.assert_counts_consistent(db)
+
+    def test_counts_after_reopen(self):
+        db = self.open_db(max_records=4)
+        for i in range(9):
+            db.insert(now_us(), "COM1" if i % 2 else "COM2", f"line {i}", f"s{i % 3}")
+        db.flush()
+        db._cleanup_old_records()
+        db.close()
+        self._managers.remove(db)
+
+        reopened = self.open_db(max_records=4)
+        self.assertEqual(reopened.get_line_count(), 4)
+        self.assert_counts_consistent(reopened)
+
+        reader = self.open_db(read_only=True)
+        self.assertEqual(reader.get_line_count(), 4)
+
+
+class TestCorruptionRecovery(DatabaseTestCase):
+    """A damaged database is moved aside, and nothing else is touched"""
+
+    GARBAGE = b"this is not an SQLite database" * 200
+
+    def files(self) -> dict:
+        """Name -> contents of everything in the database directory"""
+        return {p.name: p.read_bytes() for p in self.db_path.parent.iterdir()}
+
+    def test_only_given_path_moved(self):
+        self.db_path.write_bytes(self.GARBAGE)
+        siblings = {"other.db": b"x", "serial_data.txt": b"y", "serial_data.db.bak": b"z"}
+        for name, data in siblings.items():
+            (self.db_path.parent / name).write_bytes(data)
+
+        db = self.open_db()
+
+        files = self.files()
+        backups = [name for name in files if name.startswith("serial_data.corrupt.")]
+        self.assertEqual(len(backups), 1)
+        self.assertRegex(backups[0], r"^serial_data\.corrupt\.\d+\.db$")
+        self.assertEqual(files[backups[0]], self.GARBAGE)
+        for name, data in siblings.items():
+            self.assertEqual(files[name], data, name)
+
+        # Fresh database in its place, with the recovery noted
+        self.assertEqual([r['data'] for r in db.get_tail(1)], ["DATABASE_RECOVERED_FROM_CORRUPTION"])
+
+    def test_other_suffix(self):
+        self.db_path = self.db_path.with_name("capture.sqlite")
+        self.db_path.write_bytes(self.GARBAGE)
+        (self.db_path.parent / "capture.db").write_bytes(b"keep")
+
+        self.open_db()
+
+        files = self.files()
+        self.assertEqual(files["capture.db"], b"keep")
+        self.assertTrue(any(name.startswith("capture.corrupt.") for name in files))
+
+    def test_locked_database_not_moved(self):
+        self.open_db().close()
+        before = self.db_path.read_bytes()
+
+        locked = sqlite3.OperationalError("database is locked")
+        with mock.patch.object(DatabaseManager, '_open_conn', side_effect=locked):
+            with self.assertRaises(sqlite3.OperationalError):
+                DatabaseManager(self.db_path)
+
+        self.assertEqual(self.db_path.read_bytes(), before)
+        self.assertFalse(any("corrupt" in name for name in self.files()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+"""
+Test the MCP tools' database access without hardware or a running daemon:
+per-thread read-only handles, and first use racing to create the database
+
+Run: python -m unittest tests/test_mcp_daemon_tools.py
+"""
+import gc
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import weakref
+from pathlib import Path
+from unittest import mock
+
+# State directory for the daemon manager, before the daemon modules are imported
+os.environ.setdefault("SERIAL_MONITOR_HOME", tempfile.mkdtemp(prefix="serial-monitor-test-"))
+
+# Add daemon directory to path
+DAEMON_DIR = Path(__file__).parent.parent / "daemon"
+sys.path.insert(0, str(DAEMON_DIR))
+
+from db_manager import DatabaseManager
+from mcp_daemon_tools import DaemonMCPTools
+
+
+class ToolsTestCase(unittest.TestCase):
+    """Tools reading a database file of their own"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db_file = Path(self._tmp.name) / "serial_data.db"
+        self.tools = DaemonMCPTools()
+        self.tools.daemon_mgr.db_file = self.db_file
+
+    def tearDown(self):
+        self.tools.close()
+        self._tmp.cleanup()
+
+    def in_threads(self, count, target):
+        """Run target in count threads released together, return what they raised"""
+        start = threading.Barrier(count)
+        errors = []
+
+        def run():
+            start.wait()
+            try:
+                target()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+        return errors
+
+
+class TestPerThreadHandles(ToolsTestCase):
+    """Each thread keeps one read-only handle across calls"""
+
+    def test_handle_reused_within_thread(self):
+        self.assertIs(self.tools._db(), self.tools._db())
+        self.assertTrue(self.tools._db().read_only)
+
+    def test_threads_get_own_handles(self):
+        handles = []
+        errors = self.in_threads(4, lambda: handles.append(self.tools._db()))
+        self.assertEqual(errors, [])
+        self.assertEqual(len({id(handle) for handle in handles}), 4)
+
+    def test_reopened_when_file_replaced(self):
+        first = self.tools._db()
+        replacement = self.db_file.with_name("replacement.db")
+        writer = DatabaseManager(replacement)
+        writer.insert_immediate(time.time_ns() // 1000, "COM1", "after recovery", "s")
+        writer.close()
+        os.replace(replacement, self.db_file)
+
+        second = self.tools._db()
+        self.assertIsNot(second, first)
+        self.assertEqual([row['data'] for row in second.get_tail(1)], ["after recovery"])
+
+    def test_close_closes_all_handles(self):
+        handles = [self.tools._db()]
+        self.in_threads(2, lambda: handles.append(self.tools._db()))
+        self.tools.close()
+        for handle in handles:
+            self.assertIsNone(handle.read_connection)
+
+    def test_collected_instance_closes_handles(self):
+        tools = DaemonMCPTools()
+        tools.daemon_mgr.db_file = self.db_file
+        handle = tools._db()
+        ref = weakref.ref(tools)
+
+        del tools
+        gc.collect()
+
+        self.assertIsNone(ref())  # Nothing registered at exit keeps it alive
+        self.assertIsNone(handle.read_connection)
+
+
+class TestFirstUse(ToolsTestCase):
+    """The database is created on first use, never seen half-initialised"""
+
+    def test_concurrent_first_use(self):
+        self.assertFalse(self.db_file.exists())
+        # _db() directly: get_tail() would coalesce the identical calls into one
+        results = []
+        errors = self.in_threads(8, lambda: results.append(self.tools._db().get_tail(5)))
+        self.assertEqual(errors, [])
+        self.assertEqual(results, [[]] * 8)
+
+        # Only the database itself is left behind
+        self.assertEqual(sorted(p.name for p in self.db_file.parent.iterdir()
+                                if not p.name.endswith(('-wal', '-shm'))),
+                         ["serial_data.db"])
+
+    def test_existing_database_kept(self):
+        writer = DatabaseManager(self.db_file)
+        writer.insert_immediate(time.time_ns() // 1000, "COM1", "kept", "s")
+        writer.close()
+        self.tools._create_db(self.db_file)
+        self.assertEqual([row['data'] for row in self.tools._db().get_tail(1)], ["kept"])
+
+
+class TestStatusLineCount(ToolsTestCase):
+    """lines_captured is the session's stored lines whichever path answers"""
+
+    SESSION = "session_1"
+
+    def setUp(self):
+        super().setUp()
+        writer = DatabaseManager(self.db_file, max_records=3)
+        for i in range(5):
+            writer.insert_immediate(time.time_ns() // 1000, "COM1", f"line {i}", self.SESSION)
+        writer._cleanup_old_records()
+        writer.close()
+
+        info = {'pid': 1, 'session_id': self.SESSION}
+        patcher = mock.patch.object(self.tools.daemon_mgr, 'get_daemon_info',
+                                    side_effect=lambda: dict(info))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def status_with_reply(self, response):
+        with mock.patch.object(self.tools.commands, 'send_command', return_value=response):
+            return self.tools._read_status()
+
+    def test_from_daemon(self):
+        status = self.status_with_reply({'success': True, 'status': {
+            'lines_captured': 3, 'lines_received': 5, 'uptime': 1.5}})
+        self.assertEqual((status['lines_captured'], status['lines_received']), (3, 5))
+
+    def test_from_database(self):
+        for response in ({'success': False, 'error': 'DAEMON_UNREACHABLE'},
+                         {'success': True, 'status': {'uptime': 1.5}}):
+            with self.subTest(response=response):
+                status = self.status_with_reply(response)
+                self.assertEqual(status['lines_captured'], 3)  # Stored, not received
+                self.assertNotIn('lines_received', status)
+
+
+if __name__ == "__main__":
+    unittest.main()
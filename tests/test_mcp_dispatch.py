@@ -0,0 +1,163 @@
+"""
+Test MCP server request handling without hardware or a running daemon:
+concurrent dispatch, and one bad request not costing the others their answers
+
+Run: python -m unittest tests/test_mcp_dispatch.py
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# State directory for the daemon manager, before the daemon modules are imported
+os.environ.setdefault("SERIAL_MONITOR_HOME", tempfile.mkdtemp(prefix="serial-monitor-test-"))
+
+# Add daemon directory to path
+DAEMON_DIR = Path(__file__).parent.parent / "daemon"
+sys.path.insert(0, str(DAEMON_DIR))
+
+from mcp_server import CopilotSerialToolMCPServer
+
+
+class ServerTestCase(unittest.TestCase):
+    """Server whose output is captured as parsed responses"""
+
+    def setUp(self):
+        self.server = CopilotSerialToolMCPServer()
+        self.output = []
+        self.server._write = self.output.append
+
+    def responses(self):
+        """Parsed responses in the order they were written"""
+        return [json.loads(line) for data in self.output for line in data.splitlines()]
+
+    def run_stdin(self, *lines):
+        """Feed lines to run() as its stdin, return responses by id"""
+        stdin = io.TextIOWrapper(io.BytesIO("".join(line + "\n" for line in lines).encode()))
+        with mock.patch.object(sys, "stdin", stdin), \
+                mock.patch.object(sys, "stderr", io.StringIO()):
+            asyncio.run(self.server.run())
+        return {response["id"]: response for response in self.responses()}
+
+    def call(self, name, arguments, request_id=1):
+        """tools/call request line"""
+        return json.dumps({"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+                           "params": {"name": name, "arguments": arguments}})
+
+
+def tool_result(response):
+    """Decode the text content of a tools/call response"""
+    return json.loads(response["result"]["content"][0]["text"])
+
+
+class TestConcurrentDispatch(ServerTestCase):
+    """Requests run concurrently and answer as they finish"""
+
+    def test_fast_request_not_held_up_by_slow_one(self):
+        release = threading.Event()
+
+        def slow():
+            # Serial dispatch would make this time out: fast() never gets to run
+            return {"success": release.wait(5), "tool": "slow"}
+
+        def fast():
+            release.set()  # Only reachable while slow() is still running
+            return {"success": True, "tool": "fast"}
+
+        self.server._dispatch.update(slow_tool=slow, fast_tool=fast)
+        self.server._signatures.update(slow_tool=self.server._signatures["serial_daemon_stop"],
+                                       fast_tool=self.server._signatures["serial_daemon_stop"])
+
+        responses = self.run_stdin(self.call("slow_tool", {}, 1), self.call("fast_tool", {}, 2))
+
+        self.assertEqual(tool_result(responses[1]), {"success": True, "tool": "slow"})
+        self.assertEqual(tool_result(responses[2])["tool"], "fast")
+
+    def test_tool_error_is_a_result(self):
+        def broken():
+            raise RuntimeError("boom")
+
+        self.server._dispatch["broken"] = broken
+        self.server._signatures["broken"] = self.server._signatures["serial_daemon_stop"]
+
+        responses = self.run_stdin(self.call("broken", {}, 1))
+        result = tool_result(responses[1])
+        self.assertFalse(result["success"])
+        self.assertIn("boom", result["message"])
+
+
+class TestBadRequests(ServerTestCase):
+    """Malformed requests are answered with errors, everything else still answered"""
+
+    def test_non_object_requests(self):
+        self.server._dispatch["ok"] = lambda: {"success": True}
+        self.server._signatures["ok"] = self.server._signatures["serial_daemon_stop"]
+
+        lines = [self.call("ok", {}, 3), "[1,2]", self.call("ok", {}, 4), "5", '"x"',
+                 self.call("ok", {}, 5), "null",
+                 json.dumps({"jsonrpc": "2.0", "id": 6, "method": "tools/list"}),
+                 self.call("ok", {}, 7)]
+        self.run_stdin(*lines)
+        responses = self.responses()
+
+        answered = {r["id"]: r for r in responses if r["id"] is not None}
+        self.assertEqual(sorted(answered), [3, 4, 5, 6, 7])
+        for request_id in (3, 4, 5, 7):
+            self.assertTrue(tool_result(answered[request_id])["success"])
+
+        invalid = [r for r in responses if r["id"] is None]
+        self.assertEqual(len(invalid), 4)
+        for response in invalid:
+            self.assertEqual(response["error"]["code"], -32600)
+
+    def test_null_or_bad_arguments(self):
+        responses = self.run_stdin(
+            self.call("serial_daemon_status", None, 1),
+            self.call("serial_daemon_status", [1], 2),
+            self.call("serial_daemon_status", "x", 3),
+            json.dumps({"jsonrpc": "2.0", "id": 4, "method": "tools/call",
+                        "params": {"name": "serial_daemon_status"}}),
+            json.dumps({"jsonrpc": "2.0", "id": 5, "method": "tools/call", "params": None}),
+            json.dumps({"jsonrpc": "2.0", "id": 6, "method": "tools/call", "params": [1]}),
+            self.call(["not", "a", "name"], {}, 7),
+        )
+
+        # null arguments are the same as none given
+        for request_id in (1, 4):
+            self.assertIn("running", tool_result(responses[request_id]))
+
+        # Wrong types come back as tool errors, not internal errors
+        for request_id in (2, 3):
+            result = tool_result(responses[request_id])
+            self.assertFalse(result["success"])
+            self.assertIn("Invalid arguments", result["message"])
+        self.assertFalse(tool_result(responses[5])["success"])  # No tool name
+        self.assertEqual(responses[6]["error"]["code"], -32602)
+        self.assertFalse(tool_result(responses[7])["success"])
+
+    def test_bad_batch_entries(self):
+        responses = self.run_stdin(self.call("serial_batch", {"requests": [
+            1, {"tool": "serial_daemon_status", "arguments": None}, {"tool": "serial_batch"},
+        ]}, 1))
+        results = tool_result(responses[1])["results"]
+        self.assertFalse(results[0]["success"])
+        self.assertIn("running", results[1])
+        self.assertFalse(results[2]["success"])
+
+    def test_unknown_method(self):
+        responses = self.run_stdin(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "nope"}))
+        self.assertEqual(responses[1]["error"]["code"], -32601)
+
+    def test_multi_line_request(self):
+        responses = self.run_stdin('{"jsonrpc": "2.0", "id": 9,', '"method": "tools/list"}')
+        self.assertIn("tools", responses[9]["result"])
+
+
+if __name__ == "__main__":
+    unittest.main()
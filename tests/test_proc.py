@@ -0,0 +1,120 @@
+"""
+Test the process probes against real child processes: existence, command
+line, killing, waiting for exit, and held process references
+
+Run: python -m unittest tests/test_proc.py
+"""
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+# Add daemon directory to path
+DAEMON_DIR = Path(__file__).parent.parent / "daemon"
+sys.path.insert(0, str(DAEMON_DIR))
+
+import proc
+
+
+class ProcTestCase(unittest.TestCase):
+    """Starts throwaway child processes that are killed after the test"""
+
+    def spawn(self) -> subprocess.Popen:
+        """A child that sleeps until killed"""
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        self.addCleanup(child.wait)
+        self.addCleanup(child.kill)
+        return child
+
+
+class TestProbes(ProcTestCase):
+    """pid_exists() and cmdline()"""
+
+    def test_pid_exists(self):
+        self.assertTrue(proc.pid_exists(os.getpid()))
+        self.assertTrue(proc.pid_exists(self.spawn().pid))
+        for pid in (0, -1):
+            with self.subTest(pid=pid):
+                self.assertFalse(proc.pid_exists(pid))
+
+    def test_reaped_child_gone(self):
+        child = self.spawn()
+        child.kill()
+        child.wait()
+        self.assertFalse(proc.pid_exists(child.pid))
+
+    def test_cmdline(self):
+        args = proc.cmdline(os.getpid())
+        self.assertTrue(args)
+        self.assertTrue(all(isinstance(arg, str) for arg in args))
+
+    def test_cmdline_of_gone_process(self):
+        child = self.spawn()
+        child.kill()
+        child.wait()
+        self.assertIsNone(proc.cmdline(child.pid))
+
+
+
+class TestStop(ProcTestCase):
+    """Stopping a process"""
+
+    def test_terminate(self):
+        child = self.spawn()
+        self.assertTrue(proc.terminate(child.pid))
+        self.assertNotEqual(child.wait(timeout=5), 0)
+
+    def test_wait_exit(self):
+        child = self.spawn()
+        self.assertFalse(proc.wait_exit(child.pid, 0.1))
+        proc.terminate(child.pid)
+        self.assertTrue(proc.wait_exit(child.pid, 5))  # Unreaped still counts as gone
+
+    @unittest.skipIf(sys.platform == 'win32', "POSIX zombies only")
+    def test_reap(self):
+        child = self.spawn()
+        proc.reap(child.pid)  # Still running: nothing to collect
+        self.assertTrue(proc.pid_exists(child.pid))
+
+        proc.terminate(child.pid)
+        proc.wait_exit(child.pid, 5)
+        self.assertTrue(proc.pid_exists(child.pid))  # Zombie until reaped
+        proc.reap(child.pid)
+        self.assertFalse(proc.pid_exists(child.pid))
+
+
+
+class TestProcessRef(ProcTestCase):
+    """The same through an open_ref() reference"""
+
+    def open_ref(self, pid: int):
+        ref = proc.open_ref(pid)
+        if ref is None:
+            self.skipTest("No process references on this platform")
+        self.addCleanup(proc.close_ref, ref)
+        return ref
+
+    def test_stop_through_ref(self):
+        child = self.spawn()
+        ref = self.open_ref(child.pid)
+        self.assertTrue(proc.ref_running(ref))
+        self.assertFalse(proc.wait_exit(child.pid, 0.1, ref=ref))
+
+        self.assertTrue(proc.terminate(child.pid, ref))
+        self.assertTrue(proc.wait_exit(child.pid, 5, ref=ref))
+        self.assertFalse(proc.ref_running(ref))
+
+    def test_ref_outlives_pid(self):
+        child = self.spawn()
+        ref = self.open_ref(child.pid)
+        child.kill()
+        child.wait()  # Reaped: the PID is free for reuse, the reference isn't
+        self.assertFalse(proc.ref_running(ref))
+
+    def test_close_ref_none(self):
+        proc.close_ref(None)
+
+
+if __name__ == "__main__":
+    unittest.main()